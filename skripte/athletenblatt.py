@@ -14,8 +14,10 @@ werden von der iOS-"Vorschau" (Quick Look) zuverlaessig ausgewertet.
 
 import sys
 import io
+import numpy as np
 import pandas as pd
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.comments import Comment
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter as L
@@ -24,8 +26,10 @@ from openpyxl.chart.series import SeriesLabel
 from openpyxl.chart.data_source import StrRef
 
 from master_io import load_master
-from auswertung import select_season, kuerzel_runde
-from xlsx_cache import setze_rahmen_und_fuellung, stelle_apply_flags_sicher
+from auswertung import select_season, kuerzel_runde, abschnitte, abschnitt_zeile
+from xlsx_cache import nachbearbeite, rahmen_und_fuellung, apply_flags
+from messung import gemessen, spanne
+from blattlayout import KOPF_RENNEN, KOPF_ERGEBNIS, KOPF_SEGMENT, BREITEN
 
 ARIAL = 'Arial'
 TINTE, GRAU = '1F3348', '6B7A8A'
@@ -46,18 +50,12 @@ RAHMEN = Border(left=duenn, right=duenn, top=duenn, bottom=duenn)
 OBEN = Border(left=duenn, right=duenn, top=duenn)
 UNTEN = Border(left=duenn, right=duenn, bottom=duenn)
 
-KOPF_RENNEN = ['Datum', 'Ort', 'Rd', 'Bahn', 'Rang']
-KOPF_ERGEBNIS = ['Zeit', '0–200', '200–400', 'Diff']
-KOPF_SEGMENT = ['Start–H1'] + [f'H{i}–H{i+1}' for i in range(1, 10)] + ['H10–Ziel']
-
 C_ZEIT, C_H200, C_H400, C_DIFF = 6, 7, 8, 9
 C_SEG0 = 10                      # Start–H1
 C_SEG35_0, C_SEG35_1 = 11, 19    # die neun 35-m-Abschnitte
 C_SEGZ = 20                      # H10–Ziel
 BREIT = C_SEGZ
 
-BREITEN = [11, 17, 5, 6, 6, 9, 8, 9, 8, 10] + [13] * 9 + [14]
-
 # Spalten auf "Rohdaten"
 R_DATUM, R_ORT, R_RUNDE, R_LAUF, R_BAHN, R_RANG, R_ZEIT, R_STATUS = 2, 3, 4, 5, 6, 7, 8, 9
 R_H1, R_H5, R_H6, R_H10, R_S0 = 10, 14, 15, 19, 20
@@ -79,67 +77,139 @@ def kopfzelle(ws, zelle, text, groesse=11, fett=True, vordergrund='FFFFFF',
     return c
 
 
-def schreibe_rohdaten(ws, df):
-    import datetime as _dt
-    kopf = (['race_id', 'datum', 'ort', 'runde', 'lauf', 'bahn', 'rang', 'zeit', 'status']
+ROH_KOPF = (['race_id', 'datum', 'ort', 'runde', 'lauf', 'bahn', 'rang', 'zeit', 'status']
             + [f'h{i}' for i in range(1, 11)]
             + ['s_start'] + [f's{i}_{i+1}' for i in range(1, 10)])
-    for j, h in enumerate(kopf, 1):
-        kopfzelle(ws, f'{L(j)}1', h, groesse=9)
-    for i, (_, r) in enumerate(df.iterrows(), start=2):
-        for j, h in enumerate(kopf, 1):
-            v = r[h]
-            if v is None or (isinstance(v, float) and pd.isna(v)):
-                v = ''
-            if h == 'datum' and v:
-                v = _dt.date.fromisoformat(str(v))
-            c = ws.cell(i, j, v)
-            c.font = Font(name=ARIAL, size=9)
-            if h == 'datum':
-                c.number_format = 'DD.MM.YYYY'
-    kopfzelle(ws, f'{L(R_KURZ)}1', 'kurz', groesse=9)
-    for i, (_, r) in enumerate(df.iterrows(), start=2):
-        c = ws.cell(i, R_KURZ, kuerzel_runde(r['runde'], r['lauf']))
-        c.font = Font(name=ARIAL, size=9)
+ROH_BREITEN = [22, 11, 13, 17, 5, 5, 5, 7, 7] + [7] * 19
+
+
+def rohdaten_spalten(df):
+    """Zellwerte fuer "Rohdaten", spaltenweise aus den Frame-Spalten gebaut:
+    eine Liste je Spalte von ROH_KOPF, dazu die Rundenkuerzel ("kurz").
+    Fehlende Werte werden zu '', das Datum zu datetime.date."""
+    spalten = []
+    for h in ROH_KOPF:
+        if h == 'datum':
+            d = pd.to_datetime(df['datum'], format='ISO8601', errors='coerce')
+            spalten.append([v.date() if pd.notna(v) else '' for v in d])
+        else:
+            spalte = df[h].astype(object)
+            spalten.append(spalte.where(spalte.notna(), '').tolist())
+    kurz = [kuerzel_runde(r, l) for r, l in zip(df['runde'], df['lauf'])]
+    return spalten, kurz
+
+
+def _rohdaten_layout(ws):
     ws.column_dimensions[L(R_KURZ)].width = 7
     ws.freeze_panes = 'B2'
-    for j, b in enumerate([22, 11, 13, 17, 5, 5, 5, 7, 7] + [7] * 19, 1):
+    for j, b in enumerate(ROH_BREITEN, 1):
         ws.column_dimensions[L(j)].width = b
     ws.sheet_view.showGridLines = False
 
 
-def werte(r):
-    """Abschnittszeiten und Schrittzahlen als Zahlen, fuer die Einfaerbung."""
-    h = [r.get(f'h{i}') for i in range(1, 11)]
-    h = [None if (v is None or v == '' or pd.isna(v)) else float(v) for v in h]
-    z = r.get('zeit')
-    z = None if (z is None or z == '' or pd.isna(z)) else float(z)
-
-    seg = [h[0]]
-    for i in range(9):
-        seg.append(None if h[i] is None or h[i + 1] is None else round(h[i + 1] - h[i], 3))
-    seg.append(None if h[9] is None or z is None else round(z - h[9], 3))
-
-    s = [r.get('s_start')] + [r.get(f's{i}_{i+1}') for i in range(1, 10)]
-    s = [None if (v is None or v == '' or pd.isna(v)) else int(v) for v in s]
-    return seg, s
-
-
-def rennblock(ws, blattname, oben, daten, blass=False):
+@gemessen('xlsx.rohdaten')
+def schreibe_rohdaten(ws, df):
+    for j, h in enumerate(ROH_KOPF, 1):
+        kopfzelle(ws, f'{L(j)}1', h, groesse=9)
+    spalten, kurz = rohdaten_spalten(df)
+    schrift = Font(name=ARIAL, size=9)
+    for j, werte in enumerate(spalten, 1):
+        datum = ROH_KOPF[j - 1] == 'datum'
+        for i, v in enumerate(werte, start=2):
+            c = ws.cell(i, j, v)
+            c.font = schrift
+            if datum:
+                c.number_format = 'DD.MM.YYYY'
+    kopfzelle(ws, f'{L(R_KURZ)}1', 'kurz', groesse=9)
+    for i, k in enumerate(kurz, start=2):
+        ws.cell(i, R_KURZ, k).font = schrift
+    _rohdaten_layout(ws)
+
+
+def schreibe_rohdaten_stream(ws, df):
+    """Wie schreibe_rohdaten, aber fuer ein write_only-Blatt: Zeilen werden
+    nacheinander angehaengt und sofort weggeschrieben, statt fuer jede Zelle
+    ein Cell-Objekt im Speicher zu halten. Fuer grosse Rohdatenexporte."""
+    _rohdaten_layout(ws)
+    schrift = Font(name=ARIAL, size=9)
+    kopf_schrift = Font(name=ARIAL, size=9, bold=True, color='FFFFFF')
+    kopf_fuellung = PatternFill('solid', fgColor=TINTE)
+    kopf_ausrichtung = Alignment(horizontal='center', vertical='center', wrap_text=True)
+
+    def zelle(v, font=schrift, fuellung=None, ausrichtung=None, zahlformat=None):
+        c = WriteOnlyCell(ws, value=v)
+        c.font = font
+        if fuellung:
+            c.fill = fuellung
+        if ausrichtung:
+            c.alignment = ausrichtung
+        if zahlformat:
+            c.number_format = zahlformat
+        return c
+
+    kopf = ROH_KOPF + [None] * (R_KURZ - len(ROH_KOPF) - 1) + ['kurz']
+    ws.append([zelle(h, kopf_schrift, kopf_fuellung, kopf_ausrichtung) if h else None
+               for h in kopf])
+    spalten, kurz = rohdaten_spalten(df)
+    i_datum = ROH_KOPF.index('datum')
+    luecke = [None] * (R_KURZ - len(ROH_KOPF) - 1)
+    for zeile in zip(*spalten, kurz):
+        werte = [zelle(v, zahlformat='DD.MM.YYYY') if j == i_datum else zelle(v)
+                 for j, v in enumerate(zeile[:-1])]
+        ws.append(werte + luecke + [zelle(zeile[-1])])
+
+
+def _blattname(name, vergeben):
+    """Gueltiger, eindeutiger Excel-Blattname (max. 31 Zeichen, ohne []:*?/\\)."""
+    basis = ''.join('_' if ch in '[]:*?/\\' else ch for ch in str(name))[:31] or 'Blatt'
+    kandidat, n = basis, 2
+    while kandidat.lower() in vergeben:
+        kandidat = f'{basis[:28]}~{n}'
+        n += 1
+    vergeben.add(kandidat.lower())
+    return kandidat
+
+
+def baue_rohdaten(master, ziel, athleten=None):
+    """Rohdaten aller (oder der gewaehlten) Athlet:innen als ein Workbook mit
+    einem Blatt je Athlet:in, im write_only-Modus von openpyxl geschrieben -
+    der Speicherbedarf bleibt so auch fuer den ganzen Vereinsbestand klein.
+    Gibt (ziel, Anzahl Blaetter, Anzahl Rennen) zurueck."""
+    wb = Workbook(write_only=True)
+    vergeben, n_rennen = set(), 0
+    athleten = athleten or sorted(master['athlet'].dropna().unique())
+    for athlet, rennen in master[master['athlet'].isin(athleten)].groupby('athlet', sort=True):
+        ws = wb.create_sheet(_blattname(athlet, vergeben))
+        schreibe_rohdaten_stream(ws, rennen.sort_values('datum', kind='stable'))
+        n_rennen += len(rennen)
+    wb.save(ziel)
+    return ziel, len(vergeben), n_rennen
+
+
+@gemessen('xlsx.rennblock')
+def rennblock(ws, blattname, oben, daten, blass=False, werte=None):
     """Schreibt ein Rennen als zwei Zeilen. Gibt die naechste freie Zeile zurueck.
 
     Alle Zellwerte werden direkt aus den Python-Daten geschrieben (keine
     Formeln auf "Rohdaten") - siehe Kommentar weiter unten.
+    werte: die Zeile dieses Rennens aus auswertung.abschnitte(); ohne wird
+    sie hier fuer das eine Rennen berechnet.
     """
     unten = oben + 1
-    seg, schritte = werte(daten)
+    if werte is None:
+        werte = abschnitt_zeile(abschnitte(pd.DataFrame([daten])), 0)
     ton = '5A6B7C' if blass else '1A2430'
 
     def num(v):
         return None if (v is None or v == '' or (isinstance(v, float) and pd.isna(v))) else float(v)
 
-    h = [num(daten.get(f'h{i}')) for i in range(1, 11)]
-    zeit_num = num(daten.get('zeit'))
+    def wert(v):
+        return None if np.isnan(v) else float(v)
+
+    h = [wert(v) for v in werte['zwischen'][:10]]
+    zeit_num = wert(werte['zwischen'][10])
+    seg = [wert(v) for v in werte['seg']]
+    m200, m400, diff = (wert(v) for v in werte['splits'])
     status = daten.get('status') or 'OK'
     kurz_txt = kuerzel_runde(daten.get('runde'), daten.get('lauf'))
     datum_txt = daten.get('datum')
@@ -172,13 +242,8 @@ def rennblock(ws, blattname, oben, daten, blass=False):
     else:
         ws.cell(oben, C_ZEIT, zeit_num if zeit_num is not None else '')
 
-    m200 = None if h[4] is None or h[5] is None else h[4] + (h[5] - h[4]) * 14 / 35
     ws.cell(oben, C_H200, round(m200, 4) if m200 is not None else '')
-
-    m400 = None if m200 is None or zeit_num is None else zeit_num - m200
     ws.cell(oben, C_H400, round(m400, 4) if m400 is not None else '')
-
-    diff = None if m200 is None or m400 is None else m400 - m200
     ws.cell(oben, C_DIFF, round(diff, 4) if diff is not None else '')
 
     for j in range(1, C_DIFF + 1):
@@ -187,21 +252,18 @@ def rennblock(ws, blattname, oben, daten, blass=False):
     ws.cell(oben, C_SEG0, h[0] if h[0] is not None else '')
 
     for i in range(9):
-        if h[i] is not None and h[i + 1] is not None:
-            ws.cell(oben, C_SEG35_0 + i, f'{h[i+1]-h[i]:.2f} ({h[i+1]:.2f})')
+        if seg[i + 1] is not None:
+            ws.cell(oben, C_SEG35_0 + i, f'{seg[i+1]:.2f} ({h[i+1]:.2f})')
         else:
             ws.cell(oben, C_SEG35_0 + i, '')
 
-    if h[9] is not None and zeit_num is not None:
-        ws.cell(oben, C_SEGZ, f'{zeit_num-h[9]:.2f} ({zeit_num:.2f})')
+    if seg[10] is not None:
+        ws.cell(oben, C_SEGZ, f'{seg[10]:.2f} ({zeit_num:.2f})')
     else:
         ws.cell(oben, C_SEGZ, '')
 
-    s_namen = ['s_start'] + [f's{k}_{k+1}' for k in range(1, 10)]
-    for i in range(10):
-        sv = daten.get(s_namen[i])
-        sv = None if (sv in (None, '') or (isinstance(sv, float) and pd.isna(sv))) else int(float(sv))
-        ws.cell(unten, C_SEG0 + i, sv if sv is not None else '')
+    for i, sv in enumerate(werte['schritte']):
+        ws.cell(unten, C_SEG0 + i, int(sv) if not np.isnan(sv) else '')
 
     for j in range(1, BREIT + 1):
         c = ws.cell(oben, j)
@@ -278,8 +340,9 @@ def markiere_bestzeit(ws, oben, unten, breit):
     return zellen
 
 
-def baue(master, athlet, saison, ziel, vergleiche=4):
-    auswahl = select_season(master, athlet, saison, vergleiche)
+@gemessen('xlsx.bericht')
+def baue(master, athlet, saison, ziel, vergleiche=4, index=None):
+    auswahl = select_season(master, athlet, saison, vergleiche, index=index)
     lauf, vgl = auswahl['lauf'], auswahl['vgl']
     sb, pb, pb_jahr, pb_id = auswahl['sb'], auswahl['pb'], auswahl['pb_jahr'], auswahl['pb_id']
 
@@ -337,10 +400,11 @@ def baue(master, athlet, saison, ziel, vergleiche=4):
 
     z = 9
     saison_zeilen, block_von = [], {}
-    for _, r in lauf.iterrows():
+    werte = abschnitte(lauf)
+    for k, (_, r) in enumerate(lauf.iterrows()):
         saison_zeilen.append(z)
         block_von[r['race_id']] = z
-        z = rennblock(ws, 'Saison', z, r)
+        z = rennblock(ws, 'Saison', z, r, werte=abschnitt_zeile(werte, k))
 
     if not vgl.empty:
         z += 1
@@ -348,9 +412,10 @@ def baue(master, athlet, saison, ziel, vergleiche=4):
         kopfzelle(ws, f'A{z}', 'VERGLEICH FRÜHERE JAHRE   ·   bestes Rennen je Saison, neuestes zuerst',
                   groesse=9, fuellung=GRAU, ausrichtung='left')
         z += 1
-        for _, r in vgl.iterrows():
+        werte = abschnitte(vgl)
+        for k, (_, r) in enumerate(vgl.iterrows()):
             block_von[r['race_id']] = z
-            z = rennblock(ws, 'Saison', z, r, blass=True)
+            z = rennblock(ws, 'Saison', z, r, blass=True, werte=abschnitt_zeile(werte, k))
     letzte = z - 1
 
     pb_rahmen = {}
@@ -529,13 +594,12 @@ def baue(master, athlet, saison, ziel, vergleiche=4):
     # Danach fehlende apply*-Attribute nachtragen (siehe
     # stelle_apply_flags_sicher): ohne applyFill zeigt Excel z.B. die
     # hellgraue/-blaue Schrittzeile teils nicht an, obwohl der Fuellwert
-    # korrekt gespeichert ist.
+    # korrekt gespeichert ist. Beides in einem Durchgang ueber das Zip.
     puffer = io.BytesIO()
-    wb.save(puffer)
-    fertig = puffer.getvalue()
-    if pb_rahmen:
-        fertig = setze_rahmen_und_fuellung(fertig, 'Saison', pb_rahmen)
-    fertig = stelle_apply_flags_sicher(fertig)
+    with spanne('xlsx.speichern'):
+        wb.save(puffer)
+    durchgaenge = [rahmen_und_fuellung('Saison', pb_rahmen)] if pb_rahmen else []
+    fertig = nachbearbeite(puffer.getvalue(), durchgaenge + [apply_flags])
     if hasattr(ziel, 'write'):
         ziel.write(fertig)
     else:
@@ -545,6 +609,13 @@ def baue(master, athlet, saison, ziel, vergleiche=4):
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--rohdaten':
+        # python skripte/athletenblatt.py --rohdaten [quelle] [ziel]
+        quelle = sys.argv[2] if len(sys.argv) > 2 else 'data/master.csv'
+        ziel = sys.argv[3] if len(sys.argv) > 3 else '400mH_Rohdaten.xlsx'
+        p, n, r = baue_rohdaten(load_master(quelle), ziel)
+        print(f'{p}  ({n} Blaetter, {r} Rennen)')
+        sys.exit(0)
     athlet = sys.argv[1] if len(sys.argv) > 1 else 'Lars'
     saison = int(sys.argv[2]) if len(sys.argv) > 2 else 2026
     quelle = sys.argv[3] if len(sys.argv) > 3 else 'data/master.csv'
@@ -6,12 +6,78 @@ Bestzeit, Referenz und Vergleichsrennen zeigen. Das wird hier einmal
 berechnet und von athletenblatt.py und pdf_export.py gleichermassen benutzt.
 """
 
+import functools
+
+import numpy as np
 import pandas as pd
 
+from messung import gemessen
+
+H_SPALTEN = [f'h{i}' for i in range(1, 11)]
+S_SPALTEN = ['s_start'] + [f's{i}_{i+1}' for i in range(1, 10)]
+
+
+class MasterIndex:
+    """Einmal je Master-Stand berechnete Nachschlagetabellen fuer select_season().
+
+    Statt bei jedem Aufruf den ganzen Master nach dem Athleten zu filtern und
+    SB/PB/Jahresbeste neu zu bestimmen, wird das hier einmal per groupby
+    erledigt. Danach kostet select_season() nur noch so viel, wie der Athlet
+    Rennen hat.
+
+      zeilen       - Athlet -> Zeilenpositionen im Master (in Master-Reihenfolge)
+      pb           - Athlet -> (PB, Jahr der PB, race_id der PB)
+      sb           - (Athlet, Jahr) -> Saisonbestzeit
+      jahresbeste  - Athlet -> [(Jahr, Zeilenposition des besten Rennens), ...],
+                     aufsteigend nach Jahr
+      beschriftungen - beschriftungen() des ganzen Masters, beim ersten Zugriff
+    """
+
+    @gemessen('auswahl.index')
+    def __init__(self, master):
+        if '_jahr' not in master.columns:
+            master = master.assign(_jahr=pd.to_datetime(master['datum'], errors='coerce').dt.year)
+        self.master = master
+        self.zeilen = master.groupby('athlet', sort=False).indices
+
+        rahmen = pd.DataFrame({'athlet': master['athlet'].to_numpy(),
+                               'jahr': master['_jahr'].to_numpy(),
+                               'zeit': pd.to_numeric(master['zeit'], errors='coerce').to_numpy()})
+        mit_zeit = rahmen.dropna(subset=['zeit'])
+
+        pb_pos = mit_zeit.groupby('athlet')['zeit'].idxmin()
+        race_ids = master['race_id'].to_numpy()
+        self.pb = {a: (rahmen.at[p, 'zeit'], int(rahmen.at[p, 'jahr']), race_ids[p])
+                   for a, p in pb_pos.items()}
+
+        self.sb = mit_zeit.groupby(['athlet', 'jahr'])['zeit'].min().to_dict()
 
-def select_season(master, athlet, saison, vergleiche=4):
+        self.jahresbeste = {}
+        for (a, jahr), p in mit_zeit.groupby(['athlet', 'jahr'])['zeit'].idxmin().items():
+            self.jahresbeste.setdefault(a, []).append((jahr, p))
+
+    @functools.cached_property
+    def beschriftungen(self):
+        return beschriftungen(self.master)
+
+    def rennen(self, athlet):
+        """Alle Rennen eines Athleten als Ausschnitt des Masters (Originalindex)."""
+        pos = self.zeilen.get(athlet)
+        return self.master.iloc[pos if pos is not None else []]
+
+    def jahre(self, athlet):
+        """Jahre mit mindestens einem Rennen des Athleten, neuestes zuerst."""
+        return sorted(self.rennen(athlet)['_jahr'].dropna().unique().astype(int), reverse=True)
+
+
+@gemessen('auswahl.saison')
+def select_season(master, athlet, saison, vergleiche=4, index=None):
     """Waehlt Saisonrennen, Vergleichsrennen und Kennzahlen fuer einen Athleten.
 
+    index: optional ein fertiger MasterIndex zum selben Master - wer mehrfach
+    auswaehlt (App, Sammelexport), baut ihn einmal und reicht ihn durch.
+    Ohne wird er hier fuer diesen einen Aufruf gebaut.
+
     Rueckgabe als Dict:
       lauf        - Saisonrennen, chronologisch
       vgl         - Vergleichsrennen aus Vorjahren, neuestes Jahr zuerst
@@ -21,42 +87,35 @@ def select_season(master, athlet, saison, vergleiche=4):
       ref         - Referenzrennen fuer den Rueckstand-Chart (schnellstes
                     vollstaendiges Saisonrennen), als Series oder None
     """
-    alle = master[master['athlet'] == athlet].copy()
+    if index is None:
+        index = MasterIndex(master)
+    alle = index.rennen(athlet)
     if alle.empty:
         raise ValueError(f'Keine Rennen fuer {athlet} gefunden.')
-    if '_jahr' not in alle.columns:
-        alle['_jahr'] = pd.to_datetime(alle['datum'], errors='coerce').dt.year
 
     lauf = alle[alle['_jahr'] == saison].sort_values('datum')
     if lauf.empty:
         raise ValueError(f'Keine Rennen fuer {athlet} in {saison}.')
-    frueher = alle[alle['_jahr'] < saison].copy()
 
-    zeiten = pd.to_numeric(lauf['zeit'], errors='coerce')
-    sb = zeiten.min()
-    alle_z = pd.to_numeric(alle['zeit'], errors='coerce')
-    pb = alle_z.min()
-    pb_jahr = int(alle.loc[alle_z.idxmin(), '_jahr']) if pd.notna(pb) else None
-    pb_id = alle.loc[alle_z.idxmin(), 'race_id'] if pd.notna(pb) else None
+    sb = index.sb.get((athlet, saison), np.nan)
+    pb, pb_jahr, pb_id = index.pb.get(athlet, (np.nan, None, None))
 
     vgl = pd.DataFrame()
-    if not frueher.empty:
-        frueher['_zeit'] = pd.to_numeric(frueher['zeit'], errors='coerce')
-        g = frueher.dropna(subset=['_zeit'])
-        if not g.empty:
-            beste = g.loc[g.groupby('_jahr')['_zeit'].idxmin()]
-            rest = g.drop(beste.index)
-            if pd.notna(sb) and not rest.empty and len(beste) < vergleiche:
-                rest = rest.assign(_d=(rest['_zeit'] - sb).abs()).nsmallest(
-                    vergleiche - len(beste), '_d')
-                vgl = pd.concat([beste, rest])
-            else:
-                vgl = beste
-            vgl = vgl.sort_values('datum', ascending=False)
-
-    vollstaendig = [r for _, r in lauf.iterrows()
-                    if r['status'] == 'OK' and all(pd.notna(r[f'h{i}']) for i in range(1, 11))]
-    ref = min(vollstaendig, key=lambda r: float(r['zeit'])) if vollstaendig else None
+    beste_pos = [p for jahr, p in index.jahresbeste.get(athlet, []) if jahr < saison]
+    if beste_pos:
+        beste = index.master.iloc[beste_pos]
+        frueher = alle[alle['_jahr'] < saison]
+        zeiten = pd.to_numeric(frueher['zeit'], errors='coerce')
+        rest = frueher[zeiten.notna()].drop(beste.index)
+        if pd.notna(sb) and not rest.empty and len(beste) < vergleiche:
+            abstand = (pd.to_numeric(rest['zeit'], errors='coerce') - sb).abs()
+            rest = rest.loc[abstand.nsmallest(vergleiche - len(beste)).index]
+            vgl = pd.concat([beste, rest])
+        else:
+            vgl = beste
+        vgl = vgl.sort_values('datum', ascending=False)
+
+    ref = schnellstes_vollstaendiges(lauf)
 
     return {
         'lauf': lauf, 'vgl': vgl, 'sb': sb, 'pb': pb,
@@ -64,25 +123,76 @@ def select_season(master, athlet, saison, vergleiche=4):
     }
 
 
+def _zahlen(df, spalten):
+    """Spalten als float-Matrix (n x len(spalten)), fehlende Werte/Spalten als NaN."""
+    werte = df.reindex(columns=spalten)
+    if not all(pd.api.types.is_numeric_dtype(t) for t in werte.dtypes):
+        werte = werte.apply(pd.to_numeric, errors='coerce')
+    return werte.to_numpy(dtype=float, na_value=np.nan)
+
+
+@gemessen('auswahl.abschnitte')
+def abschnitte(df):
+    """Abschnitts-, Schritt- und Splitwerte aller Rennen eines Frames auf einmal.
+
+    Gemeinsame Rechengrundlage fuer HTML-Tabelle, Excel und PDF (und deren
+    Grafiken), statt dass jeder Export dieselben Differenzen Zeile fuer Zeile
+    aus Python-Skalaren nachrechnet. Rueckgabe als Dict von float-Arrays,
+    eine Zeile je Rennen in Frame-Reihenfolge, fehlende Werte als NaN
+    (Maske also einfach np.isnan):
+      zwischen  - n x 11: Zeit seit Start an H1..H10 und im Ziel
+      seg       - n x 11: Start-H1, die neun 35-m-Abschnitte, H10-Ziel
+      schritte  - n x 10: Schrittzahlen s_start, s1_2 ... s9_10
+      splits    - n x 3:  0-200 (aus H5/H6 interpoliert), 200-400, Diff
+
+    Die Werte sind ungerundet - gerundet wird erst bei der Anzeige.
+    """
+    zwischen = _zahlen(df, H_SPALTEN + ['zeit'])
+    seg = np.empty_like(zwischen)
+    seg[:, 0] = zwischen[:, 0]
+    seg[:, 1:] = zwischen[:, 1:] - zwischen[:, :-1]
+
+    h5, h6, zeit = zwischen[:, 4], zwischen[:, 5], zwischen[:, 10]
+    m200 = h5 + (h6 - h5) * 14 / 35
+    m400 = zeit - m200
+    splits = np.column_stack([m200, m400, m400 - m200])
+
+    return {'zwischen': zwischen, 'seg': seg,
+            'schritte': _zahlen(df, S_SPALTEN), 'splits': splits}
+
+
+def abschnitt_zeile(werte, k):
+    """Die k-te Zeile eines abschnitte()-Ergebnisses, als Dict gleicher Schluessel."""
+    return {name: arr[k] for name, arr in werte.items()}
+
+
+def vollstaendig(rennen):
+    """Boolesche Maske: Rennen beendet (status OK) und alle zehn Touchdowns erfasst."""
+    return (rennen['status'] == 'OK') & rennen.reindex(columns=H_SPALTEN).notna().all(axis=1)
+
+
+def schnellstes_vollstaendiges(rennen):
+    """Schnellstes vollstaendiges Rennen einer beliebigen Rennauswahl, als
+    Series (oder None) - die Referenz fuer den Rueckstand-Chart. Gleiche
+    Regel fuer Saison (select_season), freie Auswahl (baue_pdf_auswahl) und
+    den Vergleich-Reiter der App."""
+    kandidaten = rennen[vollstaendig(rennen)]
+    zeiten = pd.to_numeric(kandidaten['zeit'], errors='coerce').to_numpy(dtype=float)
+    if np.isnan(zeiten).all():
+        return None
+    return kandidaten.iloc[int(np.nanargmin(zeiten))]
+
+
 def segmente(row):
     """Abschnittszeiten (Start-H1, 9x35m, H10-Ziel) und Schrittzahlen einer Zeile.
 
     Werte, die fehlen, werden als None gefuehrt statt Fehler zu werfen -
     unvollstaendige Rennen (z.B. wegen verdeckter Huerde) sind normal.
+    Fuer ganze Rennlisten abschnitte() verwenden.
     """
-    def f(v):
-        return None if v is None or (isinstance(v, float) and pd.isna(v)) else float(v)
-
-    h = [f(row.get(f'h{i}')) for i in range(1, 11)]
-    z = f(row.get('zeit'))
-
-    seg = [h[0]]
-    for i in range(9):
-        seg.append(None if h[i] is None or h[i + 1] is None else round(h[i + 1] - h[i], 3))
-    seg.append(None if h[9] is None or z is None else round(z - h[9], 3))
-
-    s = [row.get('s_start')] + [row.get(f's{i}_{i+1}') for i in range(1, 10)]
-    s = [None if (v is None or (isinstance(v, float) and pd.isna(v))) else int(v) for v in s]
+    werte = abschnitt_zeile(abschnitte(pd.DataFrame([row])), 0)
+    seg = [None if np.isnan(v) else round(float(v), 3) for v in werte['seg']]
+    s = [None if np.isnan(v) else int(v) for v in werte['schritte']]
     return seg, s
 
 
@@ -95,12 +205,14 @@ def abschnittsbezeichnung(i):
     return f'H{i}–H{i+1}'
 
 
+RUNDEN_KUERZEL = {'Vorlauf': 'V', 'Halbfinal': 'H', 'Final': 'F', 'Trainingswettkampf': 'T'}
+
+
 def kuerzel_runde(runde, lauf):
     """'Vorlauf' -> 'V', 'Trainingswettkampf' + Lauf 2 -> 'T2', usw."""
-    KUERZEL = {'Vorlauf': 'V', 'Halbfinal': 'H', 'Final': 'F', 'Trainingswettkampf': 'T'}
     if not runde or (isinstance(runde, float) and pd.isna(runde)):
         return ''
-    k = KUERZEL.get(str(runde), '')
+    k = RUNDEN_KUERZEL.get(str(runde), '')
     if k and lauf not in (None, '') and not (isinstance(lauf, float) and pd.isna(lauf)):
         k = f'{k}{int(lauf)}'
     return k
@@ -112,3 +224,31 @@ def label(row):
     ort = row.get('ort') or ''
     k = kuerzel_runde(row.get('runde'), row.get('lauf'))
     return f'{datum} {ort} {k}'.rstrip()
+
+
+@gemessen('auswahl.beschriftungen')
+def beschriftungen(df):
+    """Die Beschriftungen aller Rennen in df auf einmal, spaltenweise statt
+    label()/kuerzel_runde() je Zeile. DataFrame mit dem Index von df:
+
+      datum   - '28.06.2026', leer ohne Datum
+      kuerzel - wie kuerzel_runde(): 'T1', 'V', ''
+      label   - wie label(): '28.06. Bellinzona T1'
+      auswahl - fuer Auswahllisten: 'Lars — 28.06. Bellinzona T1 (52.10 s)',
+                ohne Zeit mit dem Status statt der Zeit
+    """
+    datum = pd.to_datetime(df['datum'], errors='coerce')
+    lauf = pd.to_numeric(df['lauf'], errors='coerce')
+    kuerzel = df['runde'].map(RUNDEN_KUERZEL).fillna('').astype(str)
+    mit_lauf = (kuerzel != '') & lauf.notna()
+    kuerzel[mit_lauf] += lauf[mit_lauf].astype(int).astype(str)
+
+    ort = df['ort'].fillna('').astype(str)
+    label = (datum.dt.strftime('%d.%m.').fillna('?') + ' ' + ort + ' ' + kuerzel).str.rstrip()
+    zeit = pd.to_numeric(df['zeit'], errors='coerce')
+    ergebnis = zeit.map('{:.2f} s'.format, na_action='ignore').fillna(df['status']).astype(str)
+    return pd.DataFrame({'datum': datum.dt.strftime('%d.%m.%Y').fillna(''),
+                         'kuerzel': kuerzel,
+                         'label': label,
+                         'auswahl': df['athlet'].astype(str) + ' — ' + label + ' (' + ergebnis + ')'},
+                        index=df.index)
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""Laufzeit- und Speichermessung der Lade-, Auswahl-, Render- und Exportpfade.
+
+Erzeugt aus data/master.csv einen synthetischen Master in der gewuenschten
+Groesse (echte vollstaendige Rennen als Vorlage, Zeiten leicht gestreut,
+auf viele Athlet:innen und Jahre verteilt) und misst darauf jede Stufe:
+
+  load_master (CSV parsen, Spaltenspeicher), upsert, select_season,
+  rennen_tabelle_html, grafik_rueckstand, grafik_ermuedung,
+  athletenblatt.baue, baue_pdf, baue_pdf_auswahl, Kaderauswertung,
+  Rennsuche (Index aufbauen und zehn Anfragen)
+
+Je Stufe: Wandzeit (Minimum und Median ueber --wiederholungen), Spitzen-RSS
+waehrend der Stufe und - in einem zusaetzlichen Durchgang mit tracemalloc -
+Spitzenbelegung und Zahl der Python-Allokationen. Jede Groesse laeuft in
+einem eigenen Prozess, damit sich die Speicherspitzen nicht vermischen. Der
+Diagramm-Speicher (grafik_cache) wird vor jeder Wiederholung geleert;
+gemessen wird also immer echtes Rendern.
+
+Mit --start wird stattdessen die Importzeit der Einstiegspunkte gemessen
+(App, die CLIs, die Export-Backends), je in einem frischen Interpreter, dazu
+welche der schweren Bibliotheken dabei geladen wurden.
+
+Die Ergebnisse gehen als JSON nach benchmarks/<commit>.json; mit
+--vergleiche alt.json steht daneben das Verhaeltnis zu einem frueheren Lauf.
+
+  python skripte/benchmark.py
+  python skripte/benchmark.py --start --wiederholungen 5
+  python skripte/benchmark.py --groessen 1000 10000 100000 --athleten 300
+  python skripte/benchmark.py --nur select_season --nur baue_pdf --vergleiche benchmarks/abc1234.json
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+from master_io import SCHEMA, load_master, save_master, upsert
+
+GROESSEN = (1000, 10000, 100000)
+STUFEN = ('load_master_csv', 'load_master_speicher', 'upsert', 'select_season',
+          'rennen_tabelle_html', 'grafik_rueckstand', 'grafik_ermuedung',
+          'athletenblatt_baue', 'baue_pdf', 'baue_pdf_auswahl', 'kader_verteilung',
+          'rennsuche')
+
+ZEITSPALTEN = [f'h{i}' for i in range(1, 11)] + ['zeit']
+
+# Einstiegspunkte fuer --start und die Bibliotheken, nach denen dort geschaut wird
+EINSTIEGE = ('streamlit_app', 'exportauftraege', 'export_utils', 'html_tabelle',
+             'saisonberichte', 'athletenblatt', 'diagramme', 'pdf_export')
+SCHWERE_MODULE = ('streamlit', 'openpyxl', 'reportlab', 'matplotlib', 'pyarrow')
+
+
+# ---------------------------------------------------------------- Daten
+def synthetischer_master(n_rennen, n_athleten=300, seed=0, vorlage='data/master.csv'):
+    """Master mit n_rennen Rennen fuer n_athleten Athlet:innen, 2015-2026.
+
+    Jede Zeile ist ein vollstaendiges Rennen aus der Vorlage; alle Zeiten
+    eines Rennens werden gemeinsam um einige Prozent gestreckt oder
+    gestaucht, Schrittzahlen und Rundenangaben bleiben. race_id ist
+    eindeutig. Reproduzierbar ueber seed.
+    """
+    from auswertung import vollstaendig
+
+    rng = np.random.default_rng(seed)
+    basis = load_master(vorlage, speicher=False)
+    basis = basis[vollstaendig(basis)].reset_index(drop=True)
+    df = basis.iloc[rng.integers(len(basis), size=n_rennen)][SCHEMA].reset_index(drop=True)
+
+    faktor = rng.normal(1.0, 0.03, n_rennen)
+    for c in ZEITSPALTEN:
+        df[c] = (df[c].to_numpy() * faktor).round(2)
+    nummer = rng.integers(n_athleten, size=n_rennen)
+    df['athlet'] = pd.Series([f'Athlet {i:03d}' for i in range(n_athleten)]).to_numpy()[nummer]
+    tag = (pd.Timestamp('2015-04-01')
+           + pd.to_timedelta(rng.integers(12, size=n_rennen) * 365
+                             + rng.integers(180, size=n_rennen), unit='D'))
+    df['datum'] = tag.strftime('%Y-%m-%d')
+    df['race_id'] = [f'syn-{i:07d}' for i in range(n_rennen)]
+    return df
+
+
+# ---------------------------------------------------------------- Messung
+def _rss_kb():
+    """Aktuelle Spitzen-RSS des Prozesses in KiB (VmHWM, sonst ru_maxrss);
+    0, wo beides fehlt (Windows)."""
+    try:
+        with open('/proc/self/status') as f:
+            for zeile in f:
+                if zeile.startswith('VmHWM:'):
+                    return int(zeile.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def _spitze_zuruecksetzen():
+    """Setzt VmHWM auf die aktuelle RSS zurueck (Linux). Anderswo bleibt die
+    Spitze prozessweit - dann ist rss_spitze_mb eine Obergrenze."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def miss(stufe, wiederholungen, vorbereiten=None):
+    """Misst stufe() wiederholungen-mal (vorher jeweils vorbereiten()) und
+    einmal zusaetzlich unter tracemalloc."""
+    from grafik_cache import CACHE
+
+    def bereit():
+        CACHE.leeren()
+        if vorbereiten:
+            vorbereiten()
+        gc.collect()
+
+    zeiten = []
+    bereit()
+    _spitze_zuruecksetzen()
+    for _ in range(wiederholungen):
+        bereit()
+        start = time.perf_counter()
+        stufe()
+        zeiten.append(time.perf_counter() - start)
+    rss = _rss_kb()
+
+    bereit()
+    tracemalloc.start()
+    stufe()
+    _, spitze = tracemalloc.get_traced_memory()
+    bloecke = sum(s.count for s in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    return {'sekunden_min': min(zeiten), 'sekunden_median': statistics.median(zeiten),
+            'wiederholungen': wiederholungen, 'rss_spitze_mb': round(rss / 1024, 1),
+            'alloc_spitze_mb': round(spitze / 2 ** 20, 2), 'alloc_bloecke': bloecke}
+
+
+def _stufen(master, pfad):
+    """(stufen, kontext, parquet_weg) fuer diesen Master: stufen ist
+    {name: (stufe, vorbereiten)}, kontext beschreibt die gemessene Auswahl
+    (athlet, saison, rennen_athlet), parquet_weg() loescht den Spaltenspeicher
+    neben dem CSV."""
+    from auswertung import MasterIndex, select_season
+    from html_tabelle import rennen_tabelle_html
+    from diagramme import grafik_rueckstand, grafik_ermuedung
+    from pdf_export import baue_pdf, baue_pdf_auswahl
+    from athletenblatt import baue
+    from kader import Kaderauswertung
+    from rennsuche import Rennsuche
+
+    index = MasterIndex(master)
+    saison = int(master['_jahr'].max())
+    in_saison = master[master['_jahr'] == saison]
+    athlet = in_saison['athlet'].value_counts().index[0]
+    auswahl = select_season(master, athlet, saison, index=index)
+    verlauf = pd.concat([auswahl['lauf'], auswahl['vgl']])
+    auswahl_ids = list(in_saison['race_id'][:10])
+
+    stapel = master.sample(20, random_state=1)[SCHEMA].copy()
+    stapel.loc[stapel.index[10:], 'race_id'] += '-neu'
+    stapel_zeilen = stapel.to_dict('records')
+
+    def kader():
+        k = Kaderauswertung(master)
+        return k.verteilung(saison, ('serie', 'runde')), k.athleten(saison)
+
+    def suche():
+        s = Rennsuche(master)
+        return [s.aehnliche(r, 10) for r in s.race_ids[:10]]
+
+    def parquet_weg():
+        for p in (Path(pfad).with_suffix('.parquet'), Path(pfad).with_suffix('.stand.json')):
+            if p.exists():
+                p.unlink()
+
+    return {
+        'load_master_csv': (lambda: load_master(pfad, speicher=False), None),
+        'load_master_speicher': (lambda: load_master(pfad), lambda: load_master(pfad)),
+        'upsert': (lambda: upsert(master, stapel_zeilen), None),
+        'select_season': (lambda: select_season(master, athlet, saison, index=index), None),
+        'rennen_tabelle_html': (lambda: rennen_tabelle_html(auswahl['lauf'], auswahl['pb_id']),
+                                None),
+        'grafik_rueckstand': (lambda: grafik_rueckstand(auswahl['lauf'], auswahl['ref']), None),
+        'grafik_ermuedung': (lambda: grafik_ermuedung(verlauf), None),
+        'athletenblatt_baue': (lambda: baue(master, athlet, saison, io.BytesIO(), index=index),
+                               None),
+        'baue_pdf': (lambda: baue_pdf(master, athlet, saison, index=index), None),
+        'baue_pdf_auswahl': (lambda: baue_pdf_auswahl(master, auswahl_ids, 'Benchmark'), None),
+        'kader_verteilung': (kader, None),
+        'rennsuche': (suche, None),
+    }, {'athlet': athlet, 'saison': saison, 'rennen_athlet': len(auswahl['lauf'])}, parquet_weg
+
+
+def miss_groesse(n_rennen, n_athleten, wiederholungen, stufen, vorlage):
+    """Alle gewaehlten Stufen fuer eine Mastergroesse (im eigenen Prozess)."""
+    with tempfile.TemporaryDirectory(prefix='bench_') as ordner:
+        pfad = str(Path(ordner) / 'master.csv')
+        save_master(synthetischer_master(n_rennen, n_athleten, vorlage=vorlage), pfad)
+        master = load_master(pfad)
+        messungen, kontext, parquet_weg = _stufen(master, pfad)
+        parquet_weg()
+        ergebnisse = []
+        for name in stufen:
+            stufe, vorbereiten = messungen[name]
+            ergebnis = miss(stufe, wiederholungen, vorbereiten)
+            ergebnisse.append({'groesse': n_rennen, 'stufe': name, **ergebnis})
+            print(f'  {n_rennen:>7}  {name:22} {ergebnis["sekunden_median"] * 1000:9.1f} ms  '
+                  f'{ergebnis["rss_spitze_mb"]:7.1f} MB RSS  '
+                  f'{ergebnis["alloc_spitze_mb"]:7.2f} MB alloc', flush=True)
+        return ergebnisse, {**kontext, 'athleten': n_athleten}
+
+
+# ---------------------------------------------------------------- Start
+_IMPORT_MESSUNG = """
+import json, sys, time
+start = time.perf_counter()
+import {modul}
+dauer = time.perf_counter() - start
+print(json.dumps({{'sekunden': dauer,
+                  'geladen': [m for m in {schwer!r} if m in sys.modules]}}))
+"""
+
+
+def startzeit(modul, wiederholungen):
+    """Importzeit von modul in je einem frischen Interpreter (ohne dessen
+    eigenen Start) und die dabei geladenen schweren Bibliotheken."""
+    wurzel = Path(__file__).resolve().parent.parent
+    umgebung = {**os.environ,
+                'PYTHONPATH': os.pathsep.join([str(wurzel / 'skripte'), str(wurzel)])}
+    zeiten = []
+    for _ in range(wiederholungen):
+        lauf = subprocess.run([sys.executable, '-c', _IMPORT_MESSUNG.format(
+                                  modul=modul, schwer=SCHWERE_MODULE)],
+                              capture_output=True, text=True, check=True, cwd=wurzel,
+                              env=umgebung)
+        messung = json.loads(lauf.stdout.strip().splitlines()[-1])
+        zeiten.append(messung['sekunden'])
+    return {'groesse': 0, 'stufe': f'import {modul}', 'sekunden_min': min(zeiten),
+            'sekunden_median': statistics.median(zeiten), 'wiederholungen': wiederholungen,
+            'geladen': messung['geladen']}
+
+
+# ---------------------------------------------------------------- Ausgabe
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unbekannt'
+
+
+def vergleich(neu, alt):
+    """Zeilen 'Groesse Stufe neu/alt' fuer alle Messungen, die in beiden Laeufen vorkommen."""
+    vorher = {(e['groesse'], e['stufe']): e for e in alt['ergebnisse']}
+    zeilen = [f'Vergleich mit {alt["commit"]} (Median, Faktor neu/alt):']
+    for e in neu['ergebnisse']:
+        a = vorher.get((e['groesse'], e['stufe']))
+        if a and a['sekunden_median']:
+            faktor = e['sekunden_median'] / a['sekunden_median']
+            zeilen.append(f'  {e["groesse"]:>7}  {e["stufe"]:22} {faktor:6.2f}x'
+                          + ('   <-- langsamer' if faktor > 1.2 else ''))
+    return '\n'.join(zeilen)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Benchmarks fuer Laden, Auswahl, Rendern und Export.')
+    ap.add_argument('--groessen', type=int, nargs='+', default=list(GROESSEN),
+                    help='Anzahl Rennen im synthetischen Master')
+    ap.add_argument('--athleten', type=int, default=300)
+    ap.add_argument('--wiederholungen', type=int, default=3)
+    ap.add_argument('--nur', action='append', choices=STUFEN, help='nur diese Stufe (mehrfach moeglich)')
+    ap.add_argument('--vorlage', default='data/master.csv')
+    ap.add_argument('--ausgabe', help='JSON-Datei (Standard: benchmarks/<commit>.json)')
+    ap.add_argument('--vergleiche', help='frueheres Ergebnis-JSON zum Vergleich')
+    ap.add_argument('--start', action='store_true',
+                    help='nur die Importzeit der Einstiegspunkte messen')
+    args = ap.parse_args(argv)
+
+    stufen = [s for s in STUFEN if not args.nur or s in args.nur]
+    ergebnis = {'commit': _commit(), 'zeitpunkt': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(), 'pandas': pd.__version__,
+                'rechner': platform.node(), 'kontext': {}, 'ergebnisse': []}
+    if args.start:
+        args.groessen = []
+        for modul in EINSTIEGE:
+            e = startzeit(modul, args.wiederholungen)
+            ergebnis['ergebnisse'].append(e)
+            print(f'  {e["stufe"]:24} {e["sekunden_median"] * 1000:7.0f} ms  '
+                  f'{", ".join(e["geladen"]) or "-"}', flush=True)
+    for n in args.groessen:
+        # Frischer Prozess je Groesse: eigene Speicherspitze, kein Zustand vom Vorlauf
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            messungen, kontext = pool.submit(miss_groesse, n, args.athleten, args.wiederholungen,
+                                             stufen, args.vorlage).result()
+        ergebnis['ergebnisse'] += messungen
+        ergebnis['kontext'][str(n)] = kontext
+
+    ziel = Path(args.ausgabe or f'benchmarks/{ergebnis["commit"]}.json')
+    ziel.parent.mkdir(parents=True, exist_ok=True)
+    ziel.write_text(json.dumps(ergebnis, indent=1, ensure_ascii=False), encoding='utf-8')
+    print(ziel)
+    if args.vergleiche:
+        with open(args.vergleiche, encoding='utf-8') as f:
+            print(vergleich(ergebnis, json.load(f)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+"""Spaltenaufbau der Rennenstabelle, gemeinsam fuer xlsx und PDF.
+
+athletenblatt.py (openpyxl) und pdf_export.py (reportlab) zeichnen dieselbe
+Tabelle; die Spaltenkoepfe und -breiten stehen deshalb hier, in einem Modul
+ohne Abhaengigkeiten. So muss der PDF-Export nicht openpyxl laden, nur um an
+die Breiten des Excel-Blatts zu kommen.
+"""
+
+KOPF_RENNEN = ['Datum', 'Ort', 'Rd', 'Bahn', 'Rang']
+KOPF_ERGEBNIS = ['Zeit', '0–200', '200–400', 'Diff']
+KOPF_SEGMENT = ['Start–H1'] + [f'H{i}–H{i+1}' for i in range(1, 10)] + ['H10–Ziel']
+
+# Spaltenbreiten in Excel-Zeichen; das PDF rechnet sie auf die Seitenbreite um.
+BREITEN = [11, 17, 5, 6, 6, 9, 8, 9, 8, 10] + [13] * 9 + [14]
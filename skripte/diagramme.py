@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Die beiden Verlaufsdiagramme: Daten und PNG-Ausgabe (matplotlib).
+
+daten_rueckstand/daten_ermuedung bestimmen, was gezeichnet wird (Linien,
+Beschriftung, Titel); die App bekommt daraus ein PNG (grafik_*), der
+PDF-Export eine Vektorgrafik (vektordiagramme.py). Beide Ausgaben
+zeichnen so immer dieselben Linien mit denselben Farben und Legenden.
+
+Eigenes Modul, damit die App fuer ihre Diagramme nicht auch reportlab und
+openpyxl mit pdf_export laedt. matplotlib selbst wird erst beim ersten
+Zeichnen importiert (_matplotlib): die App zeigt Kennzahlen und Tabellen, bevor
+das erste Diagramm gebraucht wird, und ein Treffer im grafik_cache kommt
+ganz ohne aus.
+
+Gezeichnet wird auf eigenen Figure-Objekten statt ueber pyplot: pyplot
+fuehrt eine globale Figurenliste, die nicht threadsicher ist - die App
+zeichnet aber aus mehreren Sitzungs-Threads zugleich. Die Figuren kommen aus
+einem Pool (_Leinwand): Achsenstil, x-Beschriftung und Raender sind einmal
+eingerichtet, je Diagramm werden nur Linien, Legende und Titel neu gesetzt.
+"""
+
+import contextlib
+import functools
+import io
+import threading
+
+import numpy as np
+import pandas as pd
+
+from grafik_cache import gecacht
+from messung import gemessen, spanne
+from auswertung import abschnitte, beschriftungen
+
+# Dieselbe Palette wie im Markier-Tool (BAHNFARBEN) - damit Live-Vorschau,
+# xlsx-Kontext und PDF optisch zur selben Familie gehoeren statt matplotlibs
+# generischer Standardfarben (Blau/Orange/Gruen/Rot/Lila).
+LINIENFARBEN = ['#C8571F', '#2E7D6B', '#3B6FA0', '#A0439B', '#B8860B',
+                '#5E8C3F', '#B34A5C', '#3F8C8C', '#6B5B95']
+
+
+def _stil_achse(ax):
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_color('#B8C4D0')
+    ax.spines['bottom'].set_color('#B8C4D0')
+    ax.tick_params(colors='#3D4B59', labelsize=8.5)
+    ax.grid(axis='y', color='#D8DEE4', linewidth=0.9)
+    ax.set_axisbelow(True)
+
+
+@functools.cache
+def _matplotlib():
+    """Importiert und konfiguriert matplotlib einmal je Prozess; gibt
+    (Figure, FigureCanvasAgg) zurueck."""
+    with spanne('grafik.import'):
+        import matplotlib
+        matplotlib.use('Agg')
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+    # Liberation Sans ist metrisch mit Arial/Helvetica kompatibel - so wirken die
+    # matplotlib-Diagramme wie aus einem Guss mit der Helvetica-Tabelle daneben,
+    # statt wie ein Fremdkoerper in der matplotlib-Standardschrift (DejaVu Sans).
+    matplotlib.rcParams['font.family'] = 'sans-serif'
+    matplotlib.rcParams['font.sans-serif'] = ['Liberation Sans', 'Arial', 'Helvetica', 'DejaVu Sans']
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    return Figure, FigureCanvasAgg
+
+
+# Feste Figurengroesse und Raender statt tight_layout/bbox_inches='tight':
+# rechts bleibt Platz fuer die Legende, oben fuer den Titel. Nur wenn ein
+# Titel oder eine Legende doch nicht hineinpasst (sehr lange Ortsnamen, mehr
+# als etwa 18 Rennen in der Legende), wird das Bild wie frueher auf seinen
+# Inhalt zugeschnitten.
+GROESSE = (10.5, 3.6)
+RAENDER = {'left': 0.065, 'right': 0.815, 'bottom': 0.09, 'top': 0.86}
+
+
+class _Leinwand:
+    """Eine vorbereitete Figur fuer eine x-Beschriftung (mit/ohne Nulllinie)."""
+
+    def __init__(self, xt, nulllinie):
+        Figure, FigureCanvasAgg = _matplotlib()
+        self.fig = Figure(figsize=GROESSE, dpi=150)
+        FigureCanvasAgg(self.fig)
+        self.fig.subplots_adjust(**RAENDER)
+        self.ax = self.fig.subplots()
+        self.x = list(range(1, len(xt) + 1))
+        self.ax.set_xticks(self.x, xt)
+        # zorder ueber den Datenlinien, wie frueher, als sie nach ihnen kam
+        self.null = (self.ax.axhline(0, color='#B3261E', linewidth=1.2, alpha=0.55, zorder=2.5)
+                     if nulllinie else None)
+        # Der Titel ist meist breiter als die Achsen - ueber der ganzen Figur
+        # zentriert passt er in die feste Breite, ueber den Achsen nicht.
+        self.titel = self.fig.suptitle('', fontsize=11, fontweight='bold', color='#1F3348',
+                                       y=0.975)
+        _stil_achse(self.ax)
+
+    def zeichne(self, daten):
+        """Ersetzt Linien, Legende, Titel und y-Beschriftung; gibt den PNG-Puffer zurueck."""
+        ax = self.ax
+        for linie in list(ax.lines):
+            if linie is not self.null:
+                linie.remove()
+        if ax.legend_ is not None:
+            ax.legend_.remove()
+
+        for i, (name, werte) in enumerate(daten['linien']):
+            ax.plot(self.x, werte, marker='o', markersize=3, linewidth=2.0,
+                    color=LINIENFARBEN[i % len(LINIENFARBEN)], label=name)
+        ax.relim()
+        ax.autoscale_view()
+        ax.set_ylabel(daten['ylabel'], fontsize=8.5)
+        self.titel.set_text(daten['titel'])
+        legende = ax.legend(fontsize=8, frameon=False, loc='upper left',
+                            bbox_to_anchor=(1.01, 1.0)) if daten['linien'] else None
+
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format='png', dpi=150,
+                         bbox_inches=None if self._passt(self.titel, legende) else 'tight')
+        buf.seek(0)
+        return buf
+
+    def _passt(self, *texte):
+        renderer = self.fig.canvas.get_renderer()
+        rahmen = self.fig.bbox
+        for t in texte:
+            if t is None:
+                continue
+            e = t.get_window_extent(renderer)
+            if e.x0 < rahmen.x0 or e.x1 > rahmen.x1 or e.y0 < rahmen.y0 or e.y1 > rahmen.y1:
+                return False
+        return True
+
+
+class _Leinwandpool:
+    """Freie Leinwaende je Vorlage (x-Beschriftung, Nulllinie), threadsicher.
+
+    Eine Leinwand gehoert immer nur einem Thread; wer keine freie findet,
+    bekommt eine neue. Zurueckgelegt werden hoechstens max_frei je Vorlage.
+    """
+
+    def __init__(self, max_frei=4):
+        self.max_frei = max_frei
+        self._frei = {}
+        self._sperre = threading.Lock()
+
+    @contextlib.contextmanager
+    def leinwand(self, xt, nulllinie):
+        schluessel = (tuple(xt), nulllinie)
+        with self._sperre:
+            frei = self._frei.get(schluessel)
+            leinwand = frei.pop() if frei else None
+        if leinwand is None:
+            leinwand = _Leinwand(xt, nulllinie)
+        yield leinwand
+        with self._sperre:
+            frei = self._frei.setdefault(schluessel, [])
+            if len(frei) < self.max_frei:
+                frei.append(leinwand)
+
+
+POOL = _Leinwandpool()
+
+
+def daten_rueckstand(lauf, ref):
+    """Kumulierter Rueckstand zum Referenzrennen je Huerde, als Diagrammdaten
+    fuer beide Ausgaben (PNG hier, Vektor in vektordiagramme). None ohne Referenz."""
+    if ref is None or lauf.empty:
+        return None
+    rueckstand = (abschnitte(lauf)['zwischen']
+                  - abschnitte(pd.DataFrame([ref]))['zwischen'][0])
+    ref_name = f"{pd.to_datetime(ref['datum']).strftime('%d.%m.%y')} {ref['ort']} — {float(ref['zeit']):.2f} s"
+    return {'titel': f'Wo wird die Zeit gewonnen und verloren?   Referenz: {ref_name}   ·   '
+                     'unter der Nulllinie = schneller',
+            'ylabel': 'Sekunden',
+            'xt': [f'H{i}' for i in range(1, 11)] + ['Ziel'],
+            'linien': list(zip(beschriftungen(lauf)['label'], rueckstand)),
+            'nulllinie': True}
+
+
+def daten_ermuedung(rennen):
+    """Ermuedungsprofil (Verlust je Abschnitt gegenueber dem eigenen
+    schnellsten) als Diagrammdaten wie daten_rueckstand."""
+    if rennen.empty:
+        return None
+    # Nur die neun 35-m-Abschnitte, je Rennen relativ zum eigenen schnellsten
+    kern = abschnitte(rennen)['seg'][:, 1:10]
+    hat_werte = ~np.isnan(kern).all(axis=1)
+    verlust = np.full_like(kern, np.nan)
+    verlust[hat_werte] = kern[hat_werte] - np.nanmin(kern[hat_werte], axis=1, keepdims=True)
+    return {'titel': 'Ermüdungsprofil — Verlust gegenüber dem eigenen schnellsten Abschnitt',
+            'ylabel': 'Sekunden langsamer',
+            'xt': [f'H{i}–H{i+1}' for i in range(1, 10)],
+            'linien': [(name, verlust[k]) for k, name in enumerate(beschriftungen(rennen)['label'])
+                       if hat_werte[k]],
+            'nulllinie': False}
+
+
+@gemessen('grafik.rueckstand')
+def grafik_rueckstand(lauf, ref):
+    """daten_rueckstand als PNG-Puffer.
+
+    Wird ueber grafik_cache zwischengespeichert - jede Sitzung der App
+    bekommt dasselbe Bild, solange sich die gezeichneten Rennen nicht aendern.
+    """
+    if ref is None or lauf.empty:
+        return None
+    return gecacht('rueckstand', lauf, ref, lambda: _zeichne(daten_rueckstand(lauf, ref)))
+
+
+@gemessen('grafik.ermuedung')
+def grafik_ermuedung(rennen):
+    """daten_ermuedung als PNG-Puffer, zwischengespeichert wie grafik_rueckstand."""
+    if rennen.empty:
+        return None
+    return gecacht('ermuedung', rennen, None, lambda: _zeichne(daten_ermuedung(rennen)))
+
+
+def _zeichne(daten):
+    with POOL.leinwand(daten['xt'], daten['nulllinie']) as leinwand:
+        return leinwand.zeichne(daten)
@@ -3,26 +3,61 @@
 
 Bewusst ohne Streamlit-Import, damit diese Funktionen mit einfachem
 `python3 -c "..."` getestet werden koennen, ohne einen App-Kontext zu brauchen.
+
+Die Backends (athletenblatt mit openpyxl, pdf_export mit reportlab) werden
+erst im jeweiligen Aufruf importiert: wer nur eines der Formate braucht - oder
+wie die App beim Start noch gar keines -, laedt das andere nicht mit.
 """
 
 import io
 
-from athletenblatt import baue as baue_xlsx
-from pdf_export import baue_pdf, baue_pdf_auswahl
-
 
-def xlsx_bytes(master, athlet, saison):
+def xlsx_bytes(master, athlet, saison, index=None):
     """Erzeugt das Athletenblatt und gibt es als Bytes zurueck (kein Datei-Umweg)."""
+    from athletenblatt import baue as baue_xlsx
     puffer = io.BytesIO()
-    baue_xlsx(master, athlet, saison, puffer)
-    puffer.seek(0)
-    return puffer.read()
+    baue_xlsx(master, athlet, saison, puffer, index=index)
+    return puffer.getvalue()
 
 
-def pdf_bytes(master, athlet, saison):
-    return baue_pdf(master, athlet, saison).read()
+def pdf_bytes(master, athlet, saison, index=None):
+    """Saisonauswertung als PDF-Bytes."""
+    from pdf_export import schreibe_pdf
+    puffer = io.BytesIO()
+    schreibe_pdf(master, athlet, saison, puffer, index=index)
+    return puffer.getvalue()
 
 
 def pdf_bytes_auswahl(master, race_ids, titel='Rennvergleich'):
     """PDF fuer eine frei zusammengestellte Rennauswahl (Vergleich-Reiter)."""
-    return baue_pdf_auswahl(master, race_ids, titel).read()
+    from pdf_export import schreibe_pdf_auswahl
+    puffer = io.BytesIO()
+    schreibe_pdf_auswahl(master, race_ids, puffer, titel)
+    return puffer.getvalue()
+
+
+def kader_xlsx_bytes(kader, saison, nach=(), nur_beendet=True):
+    """Kaderauswertung einer Saison als Arbeitsmappe: Verteilung (Perzentile
+    je Gruppe und Merkmal), Saisonmediane und Lage im Kader je Athlet:in."""
+    import pandas as pd
+    from openpyxl.styles import Font
+
+    mediane, lage = kader.athleten(saison, nur_beendet)
+    blaetter = {'Verteilung': kader.verteilung(saison, nach, nur_beendet),
+                'Mediane': mediane.reset_index(),
+                'Lage im Kader (%)': lage.reset_index()}
+    puffer = io.BytesIO()
+    with pd.ExcelWriter(puffer, engine='openpyxl') as mappe:
+        for name, tabelle in blaetter.items():
+            tabelle.to_excel(mappe, sheet_name=name, index=False)
+            ws = mappe.sheets[name]
+            ws.freeze_panes = 'B2'
+            for spalte in ws.iter_cols(min_row=1, max_row=1):
+                zelle = spalte[0]
+                zelle.font = Font(bold=True)
+                ws.column_dimensions[zelle.column_letter].width = max(9, len(str(zelle.value)) + 2)
+            for zeile in ws.iter_rows(min_row=2):
+                for zelle in zeile:
+                    if isinstance(zelle.value, float):
+                        zelle.number_format = '0.0' if name.startswith('Lage') else '0.00'
+    return puffer.getvalue()
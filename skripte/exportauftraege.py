@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Exportauftraege im Hintergrund mit dauerhafter Ablage der fertigen Dateien.
+
+Ein Export ist durch (Art, Athlet, Saison bzw. race_ids, Titel, Datenstand)
+eindeutig bestimmt. Datenstand ist der Inhalts-Hash der beteiligten
+Athlet:innen (master_io.Versionsmarke), nicht der des ganzen Masters.
+Fertige Dateien liegen unter diesem Schluessel in data/exporte/ und
+ueberleben so Neustarts der App; jede Sitzung und jeder
+Trainer, der denselben Bericht will, bekommt die Datei von dort, statt ihn
+neu zu bauen. Aendert sich ein Rennen, aendert sich der Hash dieses Athleten
+und damit der Schluessel seiner Exporte - alte Dateien werden nie mehr
+gefunden und fallen irgendwann der Groessengrenze zum Opfer. Exporte
+anderer Athlet:innen bleiben gueltig.
+
+Die Auftragstabelle fuehrt laufende und fehlgeschlagene Auftraege. Wird ein
+Bericht angefordert, der schon laeuft, haengt sich der zweite Anfrager an
+denselben Auftrag, statt ihn ein zweites Mal zu starten.
+
+Ohne Streamlit-Import, wie export_utils.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from export_utils import xlsx_bytes, pdf_bytes, pdf_bytes_auswahl, kader_xlsx_bytes
+from messung import sammeln
+
+ENDUNG = {'xlsx': 'xlsx', 'pdf': 'pdf', 'auswahl': 'pdf', 'kader': 'xlsx'}
+
+MAX_BYTES = 512 * 2 ** 20
+
+# Zustaende eines Auftrags
+WARTET, LAEUFT, FERTIG, FEHLER = 'wartet', 'läuft', 'fertig', 'fehler'
+
+
+def artefakt_schluessel(art, stand, athlet=None, saison=None, race_ids=None, titel=None,
+                        nach=None):
+    """Dateiname-tauglicher Schluessel aus allem, was den Export bestimmt."""
+    teile = [art, athlet, saison, list(race_ids) if race_ids is not None else None,
+             titel, stand]
+    if nach is not None:
+        teile.append(list(nach))
+    return hashlib.sha256(json.dumps(teile, default=str).encode('utf-8')).hexdigest()[:32]
+
+
+class Artefaktablage:
+    """Fertige Exporte als Dateien in einem Ordner, begrenzt auf max_bytes.
+
+    Jeder Lesezugriff frischt die mtime auf; beim Aufraeumen fliegen die am
+    laengsten nicht benutzten Dateien zuerst raus. Geschrieben wird ueber eine
+    Temporaerdatei, damit ein zweiter Prozess nie eine halbe Datei ausliefert.
+    """
+
+    def __init__(self, ordner, max_bytes=MAX_BYTES):
+        self.ordner = Path(ordner)
+        self.max_bytes = max_bytes
+
+    def pfad(self, art, schluessel):
+        return self.ordner / f'{art}-{schluessel}.{ENDUNG[art]}'
+
+    def vorhanden(self, art, schluessel):
+        return self.pfad(art, schluessel).exists()
+
+    def hole(self, art, schluessel):
+        pfad = self.pfad(art, schluessel)
+        try:
+            daten = pfad.read_bytes()
+            os.utime(pfad)
+        except OSError:
+            return None
+        return daten
+
+    def lege_ab(self, art, schluessel, daten):
+        self.ordner.mkdir(parents=True, exist_ok=True)
+        pfad = self.pfad(art, schluessel)
+        tmp = pfad.with_name(f'{pfad.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            tmp.write_bytes(daten)
+            os.replace(tmp, pfad)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        self.aufraeumen()
+
+    def aufraeumen(self):
+        dateien = []
+        for p in self.ordner.iterdir():
+            if p.suffix[1:] in ENDUNG.values():
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                dateien.append((st.st_mtime, st.st_size, p))
+        belegt = sum(groesse for _, groesse, _ in dateien)
+        for _, groesse, p in sorted(dateien):
+            if belegt <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            belegt -= groesse
+
+
+class Auftrag:
+    """Ein Eintrag der Auftragstabelle."""
+
+    def __init__(self, art, schluessel, beschreibung):
+        self.art = art
+        self.schluessel = schluessel
+        self.beschreibung = beschreibung
+        self.zustand = WARTET
+        self.angelegt = time.time()
+        self.start = None
+        self.dauer = None
+        self.fehler = None
+        self.messung = None   # Zeitaufschluesselung (Text), wenn mit messen=True gebaut
+
+    def vergangen(self):
+        return 0.0 if self.start is None else time.monotonic() - self.start
+
+
+class Auftragsverwaltung:
+    """Thread-Pool, Auftragstabelle und Artefaktablage zusammen.
+
+    Threads statt Prozesse: der Master liegt in der App ohnehin im Speicher
+    und muesste sonst fuer jeden Auftrag in einen anderen Prozess kopiert
+    werden. Threadsicher; eine Instanz je App-Prozess genuegt.
+    """
+
+    def __init__(self, ablage, worker=2, max_eintraege=256):
+        self.ablage = ablage
+        self.max_eintraege = max_eintraege
+        self._pool = ThreadPoolExecutor(max_workers=worker, thread_name_prefix='export')
+        self._tabelle = OrderedDict()
+        self._dauer = {}
+        self._sperre = threading.Lock()
+
+    def auftrag(self, schluessel):
+        with self._sperre:
+            return self._tabelle.get(schluessel)
+
+    def tabelle(self):
+        """Alle bekannten Auftraege, neueste zuerst."""
+        with self._sperre:
+            return list(reversed(self._tabelle.values()))
+
+    def erwartete_dauer(self, art):
+        """Dauer des letzten fertigen Auftrags dieser Art, sonst None."""
+        return self._dauer.get(art)
+
+    def ergebnis(self, art, schluessel):
+        return self.ablage.hole(art, schluessel)
+
+    def einreichen(self, art, schluessel, erzeuge, beschreibung='', messen=False):
+        """Startet erzeuge() im Hintergrund, falls das Ergebnis weder abgelegt
+        ist noch schon erzeugt wird. Gibt den (ggf. bestehenden) Auftrag zurueck.
+        messen=True legt die Zeitaufschluesselung (messung.py) im Auftrag ab."""
+        with self._sperre:
+            auftrag = self._tabelle.get(schluessel)
+            if auftrag is not None and auftrag.zustand in (WARTET, LAEUFT):
+                return auftrag
+            auftrag = Auftrag(art, schluessel, beschreibung)
+            if self.ablage.vorhanden(art, schluessel):
+                auftrag.zustand = FERTIG
+            self._tabelle[schluessel] = auftrag
+            self._tabelle.move_to_end(schluessel)
+            while len(self._tabelle) > self.max_eintraege:
+                self._tabelle.popitem(last=False)
+        if auftrag.zustand == WARTET:
+            self._pool.submit(self._fuehre_aus, auftrag, erzeuge, messen)
+        return auftrag
+
+    def _fuehre_aus(self, auftrag, erzeuge, messen=False):
+        auftrag.start = time.monotonic()
+        auftrag.zustand = LAEUFT
+        try:
+            with sammeln(auftrag.beschreibung) if messen else contextlib.nullcontext() as sammler:
+                daten = erzeuge()
+            if sammler is not None:
+                auftrag.messung = sammler.bericht()
+            self.ablage.lege_ab(auftrag.art, auftrag.schluessel, daten)
+        except Exception as e:   # im Auftrag festhalten, der Pool-Thread lebt weiter
+            auftrag.fehler = f'{type(e).__name__}: {e}'
+            auftrag.zustand = FEHLER
+        else:
+            auftrag.zustand = FERTIG
+        auftrag.dauer = auftrag.vergangen()
+        if auftrag.zustand == FERTIG:
+            self._dauer[auftrag.art] = auftrag.dauer
+
+    # --- die Exporte aus export_utils --------------------------------------
+    # Jeweils (schluessel, erzeuge, beschreibung) fuer einreichen(); stand ist
+    # der Hash der beteiligten Athlet:innen aus der Versionsmarke (beim Kader
+    # der des ganzen Masters).
+
+    @staticmethod
+    def xlsx(master, stand, athlet, saison, index=None):
+        return (artefakt_schluessel('xlsx', stand, athlet, saison),
+                lambda: xlsx_bytes(master, athlet, saison, index=index),
+                f'Excel {athlet} {saison}')
+
+    @staticmethod
+    def pdf(master, stand, athlet, saison, index=None):
+        return (artefakt_schluessel('pdf', stand, athlet, saison),
+                lambda: pdf_bytes(master, athlet, saison, index=index),
+                f'PDF {athlet} {saison}')
+
+    @staticmethod
+    def auswahl(master, stand, race_ids, titel='Rennvergleich'):
+        race_ids = list(race_ids)
+        return (artefakt_schluessel('auswahl', stand, race_ids=race_ids, titel=titel),
+                lambda: pdf_bytes_auswahl(master, race_ids, titel),
+                f'Auswahl-PDF „{titel}“ ({len(race_ids)} Rennen)')
+
+    @staticmethod
+    def kader(kader, stand, saison, nach=()):
+        nach = list(nach)
+        return (artefakt_schluessel('kader', stand, saison=saison, nach=nach),
+                lambda: kader_xlsx_bytes(kader, saison, nach),
+                f'Kader-Excel {saison}' + (f' nach {" und ".join(nach)}' if nach else ''))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Gemeinsamer Zwischenspeicher fuer fertig gerenderte Diagramme (PNG).
+
+matplotlib-Rendering ist der teuerste Teil eines Seitenaufbaus. Die meisten
+Streamlit-Reruns aendern aber nur ein Widget, nicht die Daten, und mehrere
+Sitzungen sehen oft dieselbe Saison. Darum legt diagramme.py jedes
+Diagramm hier unter einem Schluessel aus (Diagrammart, race_ids in
+Reihenfolge, Referenz-race_id, Fingerabdruck der gezeichneten Daten) ab.
+
+Der Fingerabdruck deckt genau die Spalten der gezeichneten Rennen ab, die
+ins Bild eingehen (Touchdowns, Zeit, Legendentext). Aendert sich eines dieser
+Rennen im Master, passt der Schluessel nicht mehr; Aenderungen an anderen
+Rennen lassen den Eintrag gueltig.
+
+Ein Speicher pro Prozess, von allen Sitzungen der App gemeinsam genutzt (der
+PDF-Export zeichnet seine Diagramme als Vektorgrafik und braucht ihn nicht),
+begrenzt ueber die Gesamtgroesse der PNGs (am laengsten nicht benutzte
+Eintraege fliegen zuerst raus).
+"""
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from messung import spanne
+
+MAX_BYTES = 64 * 2 ** 20
+
+# Alles, was ins Bild eingeht: Kurven, Referenzname und Legendentext
+BILD_SPALTEN = (['race_id', 'datum', 'ort', 'runde', 'lauf', 'zeit', 'status']
+                + [f'h{i}' for i in range(1, 11)])
+
+
+class GrafikCache:
+    """LRU-Speicher fuer PNG-Bytes, begrenzt auf max_bytes insgesamt.
+
+    Threadsicher - Streamlit bedient Sitzungen aus einem Thread-Pool.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.belegt = 0
+        self._eintraege = OrderedDict()
+        self._sperre = threading.Lock()
+
+    def __len__(self):
+        return len(self._eintraege)
+
+    def hole(self, schluessel):
+        with self._sperre:
+            daten = self._eintraege.get(schluessel)
+            if daten is not None:
+                self._eintraege.move_to_end(schluessel)
+            return daten
+
+    def lege_ab(self, schluessel, daten):
+        if len(daten) > self.max_bytes:
+            return
+        with self._sperre:
+            alt = self._eintraege.pop(schluessel, None)
+            if alt is not None:
+                self.belegt -= len(alt)
+            self._eintraege[schluessel] = daten
+            self.belegt += len(daten)
+            while self.belegt > self.max_bytes:
+                _, raus = self._eintraege.popitem(last=False)
+                self.belegt -= len(raus)
+
+    def leeren(self):
+        with self._sperre:
+            self._eintraege.clear()
+            self.belegt = 0
+
+
+CACHE = GrafikCache()
+
+
+def fingerabdruck(*rahmen):
+    """Inhalts-Hash der bildrelevanten Spalten eines oder mehrerer Frames."""
+    h = hashlib.blake2b(digest_size=16)
+    for df in rahmen:
+        werte = df.reindex(columns=BILD_SPALTEN).astype(str)
+        h.update(pd.util.hash_pandas_object(werte, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def schluessel(art, rennen, ref=None):
+    """(Diagrammart, race_ids, Referenz-race_id, Fingerabdruck) fuer rennen/ref."""
+    rahmen = [rennen] if ref is None else [rennen, pd.DataFrame([ref])]
+    return (art, tuple(rennen['race_id']),
+            None if ref is None else ref['race_id'], fingerabdruck(*rahmen))
+
+
+def gecacht(art, rennen, ref, zeichne, cache=None):
+    """PNG aus dem Speicher oder frisch von zeichne() - immer als neuer BytesIO,
+    damit kein Aufrufer die Leseposition eines anderen verschiebt."""
+    cache = CACHE if cache is None else cache
+    k = schluessel(art, rennen, ref)
+    daten = cache.hole(k)
+    if daten is None:
+        with spanne('grafik.zeichnen'):
+            buf = zeichne()
+        if buf is None:
+            return None
+        daten = buf.getvalue()
+        cache.lege_ab(k, daten)
+    return io.BytesIO(daten)
@@ -1,16 +1,18 @@
 #!/usr/bin/env python3
 """HTML-Pendant zur PDF-/Excel-Rennliste, fuer die Streamlit-App.
 
-Nutzt dieselbe Berechnungslogik wie pdf_export.py (segmente(), Zwischenzeit-
+Nutzt dieselbe Berechnungslogik wie pdf_export.py (abschnitte(), Zwischenzeit-
 Klammern, 0-200/200-400/Diff), damit App, PDF und Excel nie auseinanderlaufen.
 Rendert eine echte HTML-<table> mit rowspan statt Excel-Zellverschmelzung -
 das macht den PB-Goldrahmen hier trivial und ohne die Merge-Eigenheiten, mit
 denen der Excel-Export zu kaempfen hatte.
 """
 
+import numpy as np
 import pandas as pd
 
-from auswertung import segmente, kuerzel_runde
+from auswertung import abschnitte, abschnitt_zeile, beschriftungen
+from messung import gemessen
 
 TINTE = '#1F3348'
 KOPF_HELL = '#DCE3EA'
@@ -60,28 +62,26 @@ def _fmt(v, nachkomma=2):
     return f'{v:.{nachkomma}f}'
 
 
-def _h200_h400_diff(row):
-    h5, h6, zeit = row.get('h5'), row.get('h6'), row.get('zeit')
-    if pd.isna(h5) or pd.isna(h6):
+def _wert(v):
+    """NaN aus den abschnitte()-Arrays als None, sonst float."""
+    return None if np.isnan(v) else float(v)
+
+
+def _h200_h400_diff(werte):
+    m200, m400, diff = (_wert(v) for v in werte['splits'])
+    if m200 is None:
         return None, None, None
-    m200 = h5 + (h6 - h5) * 14 / 35
-    if pd.isna(zeit):
+    if m400 is None:
         return round(m200, 2), None, None
-    m400 = zeit - m200
-    return round(m200, 2), round(m400, 2), round(m400 - m200, 2)
+    return round(m200, 2), round(m400, 2), round(diff, 2)
 
 
-def _segment_zellen(row):
+def _segment_zellen(werte):
     """Liste von (Zeit-Text, Schritt-Text) je Abschnitt - 'Segment (Zwischenzeit)'
-    wie im PDF/Excel, Start-H1 ohne Klammer."""
-    seg, schritte = segmente(row)
-
-    def f(v):
-        return None if v is None or (isinstance(v, float) and pd.isna(v)) else float(v)
-
-    h = [f(row.get(f'h{i}')) for i in range(1, 11)]
-    zeit_num = f(row.get('zeit'))
-    zwischen = [h[0]] + h[1:10] + [zeit_num]
+    wie im PDF/Excel, Start-H1 ohne Klammer. werte: eine Zeile aus abschnitte()."""
+    seg = [_wert(v) for v in werte['seg']]
+    schritte = [_wert(v) for v in werte['schritte']]
+    zwischen = [_wert(v) for v in werte['zwischen']]
 
     zellen = []
     for i in range(len(seg)):
@@ -114,18 +114,20 @@ def _kopfzeilen():
 
 def _rennzeilen_html(rennen, pb_id, vgl=False):
     html = []
-    for _, row in rennen.iterrows():
+    werte = abschnitte(rennen)
+    text = beschriftungen(rennen)
+    for k, (_, row) in enumerate(rennen.iterrows()):
+        zeile = abschnitt_zeile(werte, k)
         ist_pb = pb_id is not None and row['race_id'] == pb_id
-        m200, m400, diff = _h200_h400_diff(row)
-        datum = (pd.to_datetime(row['datum']).strftime('%d.%m.%Y')
-                 if pd.notna(row.get('datum')) else '')
+        m200, m400, diff = _h200_h400_diff(zeile)
+        datum = text['datum'].iat[k]
         ort = row.get('ort') or ''
-        rd = kuerzel_runde(row.get('runde'), row.get('lauf'))
+        rd = text['kuerzel'].iat[k]
         bahn = _fmt(row.get('bahn'), 0)
         rang = _fmt(row.get('rang'), 0)
         zeit_txt = str(row['status']) if row['status'] != 'OK' else _fmt(row.get('zeit'))
         diff_txt = (('+' if diff and diff > 0 else '') + _fmt(diff)) if diff is not None else ''
-        segmente_zellen = _segment_zellen(row)
+        segmente_zellen = _segment_zellen(zeile)
 
         klassen = ('vgl ' if vgl else '') + ('pb ' if ist_pb else '')
 
@@ -149,6 +151,7 @@ def _rennzeilen_html(rennen, pb_id, vgl=False):
     return ''.join(html)
 
 
+@gemessen('html.tabelle')
 def rennen_tabelle_html(rennen, pb_id=None, vgl=False):
     """Vollstaendige HTML-Tabelle (mit <style>) fuer eine Rennliste - direkt per
     st.markdown(..., unsafe_allow_html=True) einbindbar."""
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Kaderauswertung: Verteilung der Abschnitts-, Split- und Schrittwerte
+ueber alle Athlet:innen.
+
+select_season() schaut auf eine Athletin, der Vergleich-Reiter auf eine
+Handvoll Rennen. Hier steht der ganze Kader: je Saison (wahlweise weiter
+nach Serie und/oder Runde aufgeteilt) die Perzentile jedes der elf
+Abschnitte, von 0-200, 200-400 und Diff sowie der zehn Schrittzahlen - und
+je Athlet:in, wo ihr Saisonmedian in dieser Verteilung liegt.
+
+Gerechnet wird einmal ueber den ganzen Master (abschnitte()) und dann mit
+groupby-Quantilen, ohne Schleife ueber Rennen oder Athlet:innen. Eine
+Kaderauswertung gehoert zu einem Master-Stand, wie MasterIndex; die App
+haelt eine je Versionsmarke.
+
+  python skripte/kader.py 2026
+  python skripte/kader.py 2026 --nach serie --nach runde --csv kader_2026.csv
+  python skripte/kader.py 2026 --xlsx kader_2026.xlsx
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from auswertung import abschnitte
+from blattlayout import KOPF_SEGMENT
+from messung import gemessen
+
+SPLITS = ['0–200', '200–400', 'Diff']
+# s_start, s1_2 ... s9_10: die Schritte in den ersten zehn Abschnitten
+SCHRITTE = [f'Schritte {k}' for k in KOPF_SEGMENT[:10]]
+MERKMALE = KOPF_SEGMENT + SPLITS + SCHRITTE
+
+GRUPPEN = {'Abschnitte': KOPF_SEGMENT, 'Splits': SPLITS, 'Schritte': SCHRITTE}
+
+# Moegliche Unterteilungen einer Saison (Spalten des Masters)
+UNTERTEILUNG = ('serie', 'runde')
+OHNE = '–'   # Rennen ohne Serie/Runde bilden eine eigene Gruppe
+
+PERZENTILE = (10, 25, 50, 75, 90)
+
+
+class Kaderauswertung:
+    """Merkmalsmatrix des ganzen Masters (eine Zeile je Rennen) mit
+    Auswertungen, die je (Saison, Unterteilung) einmal berechnet werden.
+
+      verteilung(saison, nach)  - Perzentile je Gruppe und Merkmal
+      athleten(saison)          - Saisonmedian je Athlet:in und Merkmal,
+                                  dazu die Lage im Kader
+      rangliste(saison, merkmal)- dasselbe fuer ein Merkmal, sortiert
+    """
+
+    @gemessen('kader.index')
+    def __init__(self, master):
+        if '_jahr' in master.columns:
+            jahr = master['_jahr']
+        else:
+            jahr = pd.to_datetime(master['datum'], errors='coerce').dt.year
+        werte = abschnitte(master)
+        matrix = np.column_stack([werte['seg'], werte['splits'], werte['schritte']])
+        self.werte = pd.DataFrame(matrix, columns=MERKMALE)
+        self.werte['athlet'] = master['athlet'].to_numpy()
+        self.werte['jahr'] = jahr.to_numpy()
+        for spalte in UNTERTEILUNG:
+            self.werte[spalte] = master[spalte].fillna(OHNE).replace('', OHNE).to_numpy()
+        self.werte['beendet'] = (master['status'] == 'OK').to_numpy()
+        self._ergebnisse = {}
+
+    def jahre(self):
+        """Jahre mit Rennen, neuestes zuerst."""
+        return sorted(self.werte['jahr'].dropna().unique().astype(int), reverse=True)
+
+    def _saison(self, saison, nur_beendet):
+        auswahl = self.werte[self.werte['jahr'] == saison]
+        return auswahl[auswahl['beendet']] if nur_beendet else auswahl
+
+    def _gemerkt(self, schluessel, rechne):
+        # Nur gelesen, von allen Sitzungen geteilt: schlimmstenfalls rechnen
+        # zwei Threads dasselbe einmal doppelt.
+        ergebnis = self._ergebnisse.get(schluessel)
+        if ergebnis is None:
+            ergebnis = self._ergebnisse[schluessel] = rechne()
+        return ergebnis
+
+    def verteilung(self, saison, nach=(), nur_beendet=True):
+        """Perzentile je (Saison, *nach) und Merkmal, als Tabelle mit den
+        Spalten saison, *nach, merkmal, n, p10 ... p90. n zaehlt die Rennen mit
+        einem Wert in diesem Merkmal. nur_beendet=False nimmt auch DNF/DQ dazu."""
+        nach = tuple(nach)
+        if any(s not in UNTERTEILUNG for s in nach):
+            raise ValueError(f'Unterteilung nur nach {", ".join(UNTERTEILUNG)} moeglich.')
+        return self._gemerkt(('verteilung', saison, nach, nur_beendet),
+                             lambda: self._verteilung(saison, nach, nur_beendet))
+
+    @gemessen('kader.verteilung')
+    def _verteilung(self, saison, nach, nur_beendet):
+        auswahl = self._saison(saison, nur_beendet)
+        schluessel = ['jahr', *nach]
+        gruppen = auswahl.groupby(schluessel, sort=True)[MERKMALE]
+        anteile = [p / 100 for p in PERZENTILE]
+        quantile = gruppen.quantile(anteile)              # (schluessel, q) x Merkmal
+        quantile.index = quantile.index.set_names('q', level=-1)
+        tabelle = (quantile.stack().unstack('q')          # (schluessel, Merkmal) x q
+                   .rename(columns=dict(zip(anteile, [f'p{p}' for p in PERZENTILE]))))
+        tabelle.columns.name = None
+        tabelle.insert(0, 'n', gruppen.count().stack())
+        tabelle.index = tabelle.index.set_names('merkmal', level=-1)
+        tabelle = tabelle.reset_index().rename(columns={'jahr': 'saison'})
+        tabelle['merkmal'] = pd.Categorical(tabelle['merkmal'], categories=MERKMALE, ordered=True)
+        tabelle['saison'] = tabelle['saison'].astype(int)
+        tabelle['n'] = tabelle['n'].astype(int)
+        return tabelle.sort_values(['saison', *nach, 'merkmal'], ignore_index=True)
+
+    def athleten(self, saison, nur_beendet=True):
+        """(mediane, lage): je Athlet:in der Median jedes Merkmals ueber die
+        Saisonrennen, und die Lage dieses Medians im Kader in Prozent - der
+        Anteil der Athlet:innen mit kleinerem Wert (0 = kleinster im Kader).
+        Beide Tabellen: Index Athlet:in, Spalten Merkmale, dazu 'rennen'."""
+        return self._gemerkt(('athleten', saison, nur_beendet),
+                             lambda: self._athleten(saison, nur_beendet))
+
+    @gemessen('kader.athleten')
+    def _athleten(self, saison, nur_beendet):
+        auswahl = self._saison(saison, nur_beendet)
+        gruppen = auswahl.groupby('athlet', sort=True)
+        mediane = gruppen[MERKMALE].median()
+        anzahl = mediane.notna().sum()
+        lage = (mediane.rank(method='min') - 1) / anzahl.where(anzahl > 0) * 100
+        rennen = gruppen.size()
+        return mediane.assign(rennen=rennen), lage.assign(rennen=rennen)
+
+    def rangliste(self, saison, merkmal, nur_beendet=True):
+        """Athlet:innen nach ihrem Saisonmedian in merkmal, kleinster zuerst:
+        Spalten athlet, rennen, median, bestwert, rang, lage (wie athleten())."""
+        if merkmal not in MERKMALE:
+            raise ValueError(f'Unbekanntes Merkmal: {merkmal}')
+        mediane, lage = self.athleten(saison, nur_beendet)
+        auswahl = self._saison(saison, nur_beendet)
+        bestwert = auswahl.groupby('athlet', sort=True)[merkmal].min()
+        tabelle = pd.DataFrame({'rennen': mediane['rennen'], 'median': mediane[merkmal],
+                                'bestwert': bestwert, 'rang': mediane[merkmal].rank(method='min'),
+                                'lage': lage[merkmal]}).dropna(subset=['median'])
+        tabelle['rang'] = tabelle['rang'].astype(int)
+        return (tabelle.rename_axis('athlet').reset_index()
+                .sort_values(['rang', 'athlet'], ignore_index=True))
+
+
+def main(argv=None):
+    from master_io import load_master
+
+    ap = argparse.ArgumentParser(description='Perzentile des Kaders je Saison.')
+    ap.add_argument('saison', type=int)
+    ap.add_argument('--nach', action='append', choices=UNTERTEILUNG, default=[],
+                    help='Saison weiter unterteilen (mehrfach moeglich)')
+    ap.add_argument('--alle', action='store_true', help='auch nicht beendete Rennen')
+    ap.add_argument('--quelle', default='data/master.csv')
+    ap.add_argument('--csv', help='Verteilung als CSV hierhin schreiben')
+    ap.add_argument('--xlsx', help='Verteilung und Athlet:innen als Excel hierhin schreiben')
+    args = ap.parse_args(argv)
+
+    kader = Kaderauswertung(load_master(args.quelle))
+    verteilung = kader.verteilung(args.saison, args.nach, nur_beendet=not args.alle)
+    if args.csv:
+        verteilung.to_csv(args.csv, index=False)
+        print(args.csv)
+    if args.xlsx:
+        from export_utils import kader_xlsx_bytes
+        with open(args.xlsx, 'wb') as f:
+            f.write(kader_xlsx_bytes(kader, args.saison, args.nach, nur_beendet=not args.alle))
+        print(args.xlsx)
+    if not args.csv and not args.xlsx:
+        with pd.option_context('display.max_rows', None, 'display.width', 160):
+            print(verteilung.round(2).to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,10 +4,32 @@
 Das ist ab jetzt die einzige Datenquelle. xlsx-Import (daten.py) war ein
 einmaliger Schritt, um den alten Analyse32.xlsx-Bestand ins Zielschema
 zu bringen. Alles Neue kommt ueber das Markier-Tool direkt in dieses CSV.
+
+Einzelne Rennen aus Python landen zuerst im Journal daneben
+(data/master.journal.jsonl, siehe speichere_rennen) und werden von
+verdichte() ins CSV uebernommen; load_master liest beides zusammen. Das
+Journal gilt nur fuer das CSV, gegen das es geschrieben wurde: aendert sich
+das CSV anders (Markier-Tool, git pull, save_master), verfaellt es. Es ist
+lokaler Zustand und wird nicht eingecheckt - vor einem Commit des CSV
+  python skripte/master_io.py verdichte
 """
 
+import contextlib
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
+from messung import gemessen, spanne
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+
 SCHEMA = (['race_id', 'datum', 'athlet', 'ort', 'serie', 'runde', 'lauf',
            'bahn', 'rang', 'zeit', 'status', 'fps', 'quelle', 'erfasst_am',
            'video', 'notiz', 'roh_wettkampf']
@@ -20,61 +42,493 @@ NUMERISCH = (['lauf', 'bahn', 'rang', 'zeit', 'fps']
              + ['s_start'] + [f's{i}_{i+1}' for i in range(1, 10)])
 
 
-def load_master(pfad='data/master.csv'):
-    """Laedt den Master und erzwingt konsistente Typen.
-
-    Leere Zellen werden zu NaN (nicht zu leeren Strings), damit pandas'
-    numerische Funktionen (min, idxmin, Vergleiche) direkt funktionieren.
-    """
+@gemessen('master.csv_parsen')
+def _parse_csv(pfad):
+    """Liest das CSV komplett neu ein und erzwingt konsistente Typen."""
     df = pd.read_csv(pfad, dtype=str, keep_default_na=False, na_values=[''])
     for c in SCHEMA:
         if c not in df.columns:
             df[c] = pd.NA
-    df = df[SCHEMA]
+    return _typisiere(df[SCHEMA])
+
+
+def _typisiere(df):
+    """Zahlspalten als Zahl, dazu die abgeleitete Spalte _jahr."""
+    df = df.copy()
     for c in NUMERISCH:
         df[c] = pd.to_numeric(df[c], errors='coerce')
     df['_jahr'] = pd.to_datetime(df['datum'], errors='coerce').dt.year
     return df
 
 
+def speicher_pfade(pfad):
+    """(Parquet-Datei, Stand-Datei) des typisierten Spaltenspeichers zum CSV.
+
+    Beide liegen direkt neben dem CSV (data/master.parquet, data/master.stand.json)
+    und sind reine Ableitungen davon - sie duerfen jederzeit geloescht werden.
+    """
+    p = Path(pfad)
+    return p.with_suffix('.parquet'), p.with_suffix('.stand.json')
+
+
+def datei_hash(pfad):
+    """SHA-256 des Dateiinhalts als Hex-String."""
+    h = hashlib.sha256()
+    with open(pfad, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _lies_stand(stand_pfad):
+    try:
+        with open(stand_pfad, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _schreibe_atomar(pfad, schreiber):
+    """Schreibt ueber eine Temporaerdatei und benennt dann um - ein paralleler
+    Leser (zweiter Streamlit-Prozess) sieht so nie eine halbe Datei."""
+    tmp = f'{pfad}.{os.getpid()}.tmp'
+    try:
+        schreiber(tmp)
+        os.replace(tmp, pfad)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _baue_speicher(df, pfad, stand):
+    parquet_pfad, stand_pfad = speicher_pfade(pfad)
+    try:
+        _schreibe_atomar(parquet_pfad, lambda t: df.to_parquet(t, index=False))
+    except (ImportError, OSError, ValueError):
+        # Kein pyarrow installiert oder Verzeichnis schreibgeschuetzt:
+        # dann eben ohne Speicher, das CSV bleibt massgeblich.
+        return
+    _schreibe_atomar(stand_pfad, lambda t: Path(t).write_text(json.dumps(stand), encoding='utf-8'))
+
+
+class Versionsmarke:
+    """Inhalts-Hash des Masters, gesamt und je Athlet:in.
+
+    athlet(name) aendert sich nur, wenn eines der Rennen dieses Athleten
+    geaendert wird, dazukommt oder wegfaellt - Caches fuer einen Athleten
+    (Exporte, Auswahl) bleiben so bei Aenderungen an anderen gueltig. gesamt
+    ist der Hash ueber alle Athleten-Hashes; Gleichheit und hash() gehen
+    ueber gesamt.
+    """
+
+    def __init__(self, gesamt, athleten):
+        self.gesamt = gesamt
+        self.athleten = athleten
+
+    def athlet(self, name):
+        return self.athleten.get(name, 'leer')
+
+    def fuer(self, namen):
+        """Gemeinsamer Hash fuer mehrere Athlet:innen (z.B. eine Rennauswahl)."""
+        h = hashlib.blake2b(digest_size=16)
+        for name in sorted(set(namen)):
+            h.update(f'{name}\0{self.athlet(name)}\0'.encode('utf-8'))
+        return h.hexdigest()
+
+    def geaendert_gegen(self, alt):
+        """Athlet:innen, deren Rennen sich gegenueber der Marke alt geaendert
+        haben (auch neu hinzugekommene oder ganz entfernte), alphabetisch."""
+        namen = set(self.athleten) | set(alt.athleten)
+        return sorted(n for n in namen if self.athleten.get(n) != alt.athleten.get(n))
+
+    def __eq__(self, other):
+        return isinstance(other, Versionsmarke) and other.gesamt == self.gesamt
+
+    def __hash__(self):
+        return hash(self.gesamt)
+
+    def __repr__(self):
+        return f'Versionsmarke({self.gesamt[:12]}, {len(self.athleten)} Athlet:innen)'
+
+
+@gemessen('master.versionsmarke')
+def versionsmarke_von(df):
+    """Berechnet die Versionsmarke aus dem Inhalt (alle SCHEMA-Spalten).
+
+    Je Zeile ein 64-bit-Hash (pandas, vektorisiert), die Zeilen-Hashes je
+    Athlet nach race_id geordnet hintereinander in blake2b.
+    """
+    # Zahlen immer als float64 und Zeilen je Athlet nach race_id: dieselben
+    # Rennen ergeben dieselbe Marke, egal ob frisch aus dem CSV geparst oder
+    # aus Snapshot + Journal zusammengesetzt
+    kanonisch = df[SCHEMA].astype({c: 'float64' for c in NUMERISCH})
+    zeilen = pd.util.hash_pandas_object(kanonisch, index=False).to_numpy()
+    codes, namen = pd.factorize(df['athlet'], sort=True)
+    ordnung = np.lexsort((pd.factorize(df['race_id'], sort=True)[0], codes))
+    grenzen = np.searchsorted(codes[ordnung], np.arange(len(namen) + 1))
+    zeilen = zeilen[ordnung]
+    athleten = {name: hashlib.blake2b(zeilen[grenzen[i]:grenzen[i + 1]].tobytes(),
+                                      digest_size=16).hexdigest()
+                for i, name in enumerate(namen)}
+    gesamt = hashlib.blake2b(digest_size=16)
+    for name in namen:
+        gesamt.update(f'{name}\0{athleten[name]}\0'.encode('utf-8'))
+    # Rennen ohne Athlet (code -1, vorne einsortiert) gehen nur ins Gesamt ein
+    gesamt.update(zeilen[:grenzen[0]].tobytes())
+    return Versionsmarke(gesamt.hexdigest(), athleten)
+
+
+def _als_stand(marke):
+    return {'gesamt': marke.gesamt, 'athleten': marke.athleten}
+
+
+def versionsmarke(pfad='data/master.csv'):
+    """Versionsmarke zu CSV + Journal, ohne den Master zu laden, solange beide
+    zur Stand-Datei des Spaltenspeichers passen (die Marke steht dann dort).
+    Sonst wird ueber load_master neu eingelesen und die Marke nachgetragen."""
+    stand_pfad = speicher_pfade(pfad)[1]
+    kennung, journal = _kennung(pfad), _kennung(journal_pfad(pfad))
+    stand = _lies_stand(stand_pfad)
+    if stand and stand.get('schema') == SCHEMA and stand.get('kennung') == kennung:
+        if journal is None and 'version' in stand:
+            return Versionsmarke(**stand['version'])
+        if journal is not None and stand.get('journal', {}).get('kennung') == journal:
+            return Versionsmarke(**stand['journal']['version'])
+
+    marke = versionsmarke_von(load_master(pfad))
+    stand = _lies_stand(stand_pfad)
+    if stand and stand.get('kennung') == kennung:
+        if journal is None:
+            stand['version'] = _als_stand(marke)
+        else:
+            stand['journal'] = {'kennung': journal, 'version': _als_stand(marke)}
+        _schreibe_atomar(stand_pfad, lambda t: Path(t).write_text(json.dumps(stand),
+                                                                  encoding='utf-8'))
+    return marke
+
+
+def _kennung(pfad):
+    """[mtime_ns, Groesse] einer Datei; None, wenn sie fehlt oder leer ist."""
+    try:
+        st = os.stat(pfad)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size] if st.st_size else None
+
+
+@gemessen('master.laden')
+def load_master(pfad='data/master.csv', speicher=True):
+    """Laedt den Master und erzwingt konsistente Typen.
+
+    Leere Zellen werden zu NaN (nicht zu leeren Strings), damit pandas'
+    numerische Funktionen (min, idxmin, Vergleiche) direkt funktionieren.
+
+    Der Master ist das CSV (Snapshot) plus alle Eintraege im Journal
+    daneben (siehe speichere_rennen), in Reihenfolge nachgespielt. Das
+    Journal wird vor dem Snapshot gelesen: laeuft gleichzeitig eine
+    Verdichtung, sieht der Leser schlimmstenfalls Eintraege, die schon im
+    neuen CSV stehen - und die nachzuspielen aendert nichts.
+    """
+    basis, eintraege = _lies_journal(pfad)
+    if eintraege and basis != _csv_basis(pfad):
+        eintraege = []   # gegen ein anderes CSV geschrieben: verfallen
+    df = _lade_snapshot(pfad, speicher)
+    return _spiele_ein(df, eintraege) if eintraege else df
+
+
+def _lade_snapshot(pfad, speicher=True):
+    """Nur das CSV, ohne Journal.
+
+    Mit speicher=True wird das fertig typisierte Ergebnis als Parquet neben
+    dem CSV abgelegt (siehe speicher_pfade) und beim naechsten Aufruf direkt
+    von dort gelesen, solange das CSV unveraendert ist. Geprueft wird zuerst
+    nur mtime und Groesse; weichen die ab (z.B. nach git checkout), entscheidet
+    der Inhalts-Hash, ob wirklich neu geparst werden muss.
+    """
+    if not speicher:
+        return _parse_csv(pfad)
+
+    kennung = _kennung(pfad)
+    parquet_pfad, stand_pfad = speicher_pfade(pfad)
+    stand = _lies_stand(stand_pfad)
+    if stand and stand.get('schema') == SCHEMA and parquet_pfad.exists():
+        gleich = stand.get('kennung') == kennung
+        if not gleich and stand.get('sha256') == datei_hash(pfad):
+            stand['kennung'] = kennung
+            _schreibe_atomar(stand_pfad, lambda t: Path(t).write_text(json.dumps(stand),
+                                                                      encoding='utf-8'))
+            gleich = True
+        if gleich:
+            try:
+                with spanne('master.speicher_lesen'):
+                    return pd.read_parquet(parquet_pfad)
+            except (ImportError, OSError, ValueError):
+                pass
+
+    df = _parse_csv(pfad)
+    _baue_speicher(df, pfad, {'kennung': kennung, 'sha256': datei_hash(pfad), 'schema': SCHEMA,
+                              'version': _als_stand(versionsmarke_von(df))})
+    return df
+
+
 def save_master(df, pfad='data/master.csv'):
     """Schreibt den Master zurueck, sortiert nach Athlet und Datum.
 
+    Schreibt das ganze CSV neu (ueber eine Temporaerdatei) - fuer einzelne
+    Rennen ist speichere_rennen da, das nur ans Journal anhaengt. df ersetzt
+    den ganzen Master: das Journal wird unter derselben Sperre geleert, seine
+    Eintraege gelten als in df enthalten (load_master liefert sie mit).
     Leere Werte werden als leere Zellen geschrieben (nicht 'nan' oder 'NaT'),
     damit das CSV auch von Hand oder in Numbers lesbar bleibt.
     """
-    out = df[SCHEMA].sort_values(['athlet', 'datum'], kind='stable').reset_index(drop=True)
-    out.to_csv(pfad, index=False, encoding='utf-8', na_rep='')
+    with _journal_sperre(pfad):
+        out = _schreibe_csv(df, pfad)
+        _leere_journal(pfad)
     return out
 
 
+def _schreibe_csv(df, pfad):
+    out = _sortiert(df[SCHEMA])
+    _schreibe_atomar(pfad, lambda t: out.to_csv(t, index=False, encoding='utf-8', na_rep=''))
+    return out
+
+
+def _sortiert(df):
+    return df.sort_values(['athlet', 'datum'], kind='stable').reset_index(drop=True)
+
+
+@gemessen('master.upsert')
 def upsert(df, neue_rennen):
     """Fuegt Rennen ein oder ersetzt sie anhand von race_id.
 
-    neue_rennen: Liste von Dicts im SCHEMA-Format (fehlende Felder erlaubt).
+    neue_rennen: Liste von Dicts im SCHEMA-Format (fehlende Felder erlaubt)
+    oder ein DataFrame - typischerweise ein ganzer Wettkampf auf einmal.
     Gibt (aktualisiertes df, Liste neuer race_id, Liste ersetzter race_id) zurueck.
+
+    Alles in einem Durchgang: die neuen Zeilen werden einmal typisiert, ueber
+    einen race_id-Index den bestehenden Positionen zugeordnet, ersetzte Zeilen
+    spaltenweise in die Kopie geschrieben und alle echten Neuzugaenge mit
+    einem einzigen concat angehaengt. df selbst bleibt unveraendert: es wird
+    einmal kopiert und, wenn Rennen ersetzt werden, jede Spalte beim
+    Ueberschreiben noch einmal - neu typisiert (geparst) wird der Bestand
+    aber nicht. Das Ergebnis hat nur die SCHEMA-Spalten und _jahr; weitere
+    Spalten von df fallen weg. Kommt eine race_id im Stapel mehrfach vor,
+    gewinnt wie bisher der letzte Eintrag (und sie zaehlt einmal als neu,
+    danach als ersetzt).
     """
-    df = df.drop(columns=['_jahr'], errors='ignore').copy()
-    neu_ids, ersetzt_ids = [], []
-    for rennen in neue_rennen:
-        rid = rennen.get('race_id')
-        if not rid:
+    if isinstance(neue_rennen, pd.DataFrame):
+        neue_rennen = neue_rennen.to_dict('records')
+    zeilen = [{c: rennen.get(c, pd.NA) for c in SCHEMA} for rennen in neue_rennen]
+    for zeile in zeilen:
+        rid = zeile['race_id']
+        if pd.isna(rid) or not rid:
             raise ValueError('Rennen ohne race_id kann nicht gespeichert werden.')
-        zeile = {c: rennen.get(c, pd.NA) for c in SCHEMA}
-        treffer = df.index[df['race_id'] == rid]
-        if len(treffer):
-            df.loc[treffer[0]] = zeile
-            ersetzt_ids.append(rid)
-        else:
-            df = pd.concat([df, pd.DataFrame([zeile])], ignore_index=True)
-            neu_ids.append(rid)
-    for c in NUMERISCH:
-        df[c] = pd.to_numeric(df[c], errors='coerce')
-    df['_jahr'] = pd.to_datetime(df['datum'], errors='coerce').dt.year
+
+    if '_jahr' not in df.columns:
+        df = _typisiere(df[SCHEMA])
+    df = df[SCHEMA + ['_jahr']].copy()
+    if not zeilen:
+        return df, [], []
+
+    position = pd.Series(range(len(df)), index=df['race_id'])
+    position = position[~position.index.duplicated()]
+    neu_ids, ersetzt_ids, bekannt = [], [], set(position.index)
+    for zeile in zeilen:
+        rid = zeile['race_id']
+        (ersetzt_ids if rid in bekannt else neu_ids).append(rid)
+        bekannt.add(rid)
+
+    stapel = _typisiere(pd.DataFrame(zeilen, columns=SCHEMA))
+    stapel = stapel.drop_duplicates('race_id', keep='last')
+    for c in SCHEMA:
+        if c not in NUMERISCH and stapel[c].dtype != df[c].dtype:
+            stapel[c] = stapel[c].astype(df[c].dtype)
+    ziel = stapel['race_id'].map(position)
+    treffer = ziel.notna().to_numpy()
+
+    if treffer.any():
+        pos = ziel[treffer].astype(int).to_numpy()
+        ersatz = stapel[treffer]
+        for c in df.columns:
+            spalte = df[c].copy()
+            if spalte.dtype != ersatz[c].dtype:
+                # z.B. NaN in eine reine int-Spalte: auf den gemeinsamen Typ heben
+                gemeinsam = pd.concat([spalte.iloc[:0], ersatz[c].iloc[:0]]).dtype
+                spalte = spalte.astype(gemeinsam)
+            spalte.iloc[pos] = ersatz[c].astype(spalte.dtype).to_numpy()
+            df[c] = spalte
+    if not treffer.all():
+        df = pd.concat([df, stapel[~treffer]], ignore_index=True)
     return df, neu_ids, ersetzt_ids
 
 
+# ---------------------------------------------------------------- Journal
+# Einzelne Rennen werden nicht ins CSV geschrieben, sondern als eine Zeile
+# JSON je Stapel an data/master.journal.jsonl angehaengt - Aufwand je
+# Schreibvorgang proportional zu den geaenderten Rennen, nicht zum Master.
+# Jeder Anhaenger haelt dabei eine Dateisperre und schreibt seine Zeile mit
+# einem einzigen write(); parallele Schreiber auf derselben Platte kommen
+# sich so nicht in die Quere. verdichte() schreibt CSV + Journal als neues
+# CSV und leert das Journal, automatisch ab VERDICHTEN_AB Bytes.
+#
+# Die erste Zeile nennt den SHA-256 des CSV, auf dem das Journal aufsetzt
+# ({"op": "basis", ...}). Passt er nicht mehr zum CSV, wurde dieses seither
+# anders ersetzt; die Eintraege verfallen dann - load_master ignoriert sie,
+# der naechste Anhaenger beginnt ein neues Journal.
+
+VERDICHTEN_AB = 1 << 20
+
+
+def journal_pfad(pfad):
+    return Path(pfad).with_suffix('.journal.jsonl')
+
+
+@contextlib.contextmanager
+def _journal_sperre(pfad):
+    """Exklusive Sperre ueber eine eigene .lock-Datei (das Journal selbst wird
+    beim Verdichten geleert). Ohne fcntl (Windows) ohne Sperre."""
+    if fcntl is None:
+        yield
+        return
+    with open(f'{journal_pfad(pfad)}.lock', 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _csv_basis(pfad):
+    """SHA-256 des CSV; aus der Stand-Datei, solange mtime und Groesse passen."""
+    stand = _lies_stand(speicher_pfade(pfad)[1])
+    if stand and stand.get('sha256') and stand.get('kennung') == _kennung(pfad):
+        return stand['sha256']
+    return datei_hash(pfad)
+
+
+def _leere_journal(pfad):
+    with contextlib.suppress(FileNotFoundError):
+        os.truncate(journal_pfad(pfad), 0)
+
+
+def _json_wert(v):
+    """Zelle -> JSON: fehlend wird None, numpy-Skalare Python-Zahlen, Zeitstempel Text."""
+    if isinstance(v, np.generic):
+        v = v.item()
+    if v is None or pd.isna(v):
+        return None
+    return str(v) if isinstance(v, pd.Timestamp) else v
+
+
+def _json_zeile(eintrag):
+    return (json.dumps(eintrag, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def _haenge_an(pfad, eintrag):
+    zeile = _json_zeile(eintrag)
+    with _journal_sperre(pfad):
+        basis = _csv_basis(pfad)
+        modus = os.O_WRONLY | os.O_CREAT
+        if _lies_journal(pfad, nur_basis=True)[0] == basis:
+            modus |= os.O_APPEND
+        else:
+            # Leer oder gegen ein anderes CSV geschrieben: neu beginnen
+            modus |= os.O_TRUNC
+            zeile = _json_zeile({'op': 'basis', 'sha256': basis}) + zeile
+        fd = os.open(journal_pfad(pfad), modus, 0o644)
+        try:
+            os.write(fd, zeile)
+        finally:
+            os.close(fd)
+    j = _kennung(journal_pfad(pfad))
+    if j is not None and j[1] >= VERDICHTEN_AB:
+        verdichte(pfad)
+
+
+def speichere_rennen(neue_rennen, pfad='data/master.csv'):
+    """Haengt Rennen (Liste von Dicts oder DataFrame, wie bei upsert) als
+    einen Eintrag ans Journal. Beim naechsten load_master ersetzen sie
+    Rennen mit gleicher race_id oder kommen neu dazu."""
+    if isinstance(neue_rennen, pd.DataFrame):
+        neue_rennen = neue_rennen.to_dict('records')
+    rennen = []
+    for r in neue_rennen:
+        zeile = {c: _json_wert(r.get(c)) for c in SCHEMA}
+        if not zeile['race_id']:
+            raise ValueError('Rennen ohne race_id kann nicht gespeichert werden.')
+        rennen.append({c: v for c, v in zeile.items() if v is not None})
+    if rennen:
+        _haenge_an(pfad, {'op': 'upsert', 'rennen': rennen})
+
+
+def loesche_rennen(race_ids, pfad='data/master.csv'):
+    """Vermerkt im Journal, dass diese Rennen entfernt werden."""
+    race_ids = [str(r) for r in race_ids]
+    if race_ids:
+        _haenge_an(pfad, {'op': 'loesche', 'race_ids': race_ids})
+
+
+def lies_journal(pfad='data/master.csv'):
+    """Alle Journal-Eintraege in Reihenfolge, ohne die Basiszeile - auch
+    verfallene (siehe load_master). Eine unvollstaendige letzte Zeile
+    (Schreiber gerade dabei oder abgestuerzt) wird ignoriert."""
+    return _lies_journal(pfad)[1]
+
+
+def _lies_journal(pfad, nur_basis=False):
+    """(SHA-256 der Basis oder None, Eintraege)."""
+    try:
+        with open(journal_pfad(pfad), encoding='utf-8') as f:
+            zeilen = (f.readline() if nur_basis else f.read()).split('\n')
+    except FileNotFoundError:
+        return None, []
+    eintraege = []
+    for zeile in zeilen[:-1]:   # nach dem letzten \n steht nichts oder eine halbe Zeile
+        if zeile.strip():
+            eintraege.append(json.loads(zeile))
+    if not eintraege or eintraege[0].get('op') != 'basis':
+        return None, eintraege
+    return eintraege[0]['sha256'], eintraege[1:]
+
+
+@gemessen('master.journal')
+def _spiele_ein(df, eintraege):
+    """Wendet Journal-Eintraege auf den Snapshot an. Aufeinanderfolgende
+    upserts gehen als ein Stapel durch upsert (gleiche race_id: letzter
+    gewinnt); danach wie im CSV nach Athlet und Datum sortiert."""
+    stapel = []
+    for eintrag in eintraege:
+        if eintrag['op'] == 'upsert':
+            stapel += eintrag['rennen']
+            continue
+        if stapel:
+            df, _, _ = upsert(df, stapel)
+            stapel = []
+        df = df[~df['race_id'].isin(eintrag['race_ids'])]
+    if stapel:
+        df, _, _ = upsert(df, stapel)
+    return _sortiert(df)
+
+
+def verdichte(pfad='data/master.csv'):
+    """Schreibt Snapshot + Journal als neues CSV und leert das Journal.
+    Gibt die Zahl der eingearbeiteten Eintraege zurueck; ein verfallenes
+    Journal wird nur geleert (0)."""
+    with _journal_sperre(pfad):
+        basis, eintraege = _lies_journal(pfad)
+        if eintraege and basis == _csv_basis(pfad):
+            _schreibe_csv(_spiele_ein(_lade_snapshot(pfad), eintraege), pfad)
+        else:
+            eintraege = []
+        _leere_journal(pfad)
+    return len(eintraege)
+
+
 if __name__ == '__main__':
+    import sys
+    if sys.argv[1:2] == ['verdichte']:
+        print(f'{verdichte(*sys.argv[2:3])} Journal-Eintraege ins CSV uebernommen')
+        sys.exit()
     d = load_master()
     print(f'{len(d)} Rennen, {d["athlet"].nunique()} Athleten, '
           f'{int(d["_jahr"].min())}\u2013{int(d["_jahr"].max())}')
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Beobachtet data/master.csv und haelt die aktuelle Versionsmarke bereit.
+
+Ein Hintergrund-Thread fragt jede Sekunde mtime und Groesse von CSV und
+Journal (master_io.journal_pfad) ab - je ein os.stat, kein externer Dienst,
+funktioniert auf jedem Dateisystem. Erst wenn sich etwas geaendert hat und
+danach eine Runde lang stabil bleibt - das Markier-Tool oder ein git pull
+schreibt die Datei nicht in einem Zug -, wird die neue
+Versionsmarke bestimmt (master_io.versionsmarke, das dabei auch den
+Spaltenspeicher auffrischt) und als version bereitgestellt.
+
+Wer vom Master abhaengt, schluesselt mit der Versionsmarke: ein Wechsel
+der Marke ist das Signal, alles andere bleibt gueltig.
+"""
+
+import os
+import sys
+import threading
+import traceback
+
+from master_io import versionsmarke, journal_pfad
+
+INTERVALL = 1.0
+
+
+class MasterWaechter:
+    """Haelt version (master_io.Versionsmarke) zum CSV unter pfad aktuell.
+
+    Wer davon abhaengt, liest version und vergleicht mit der zuletzt
+    gesehenen (die App in ihrem datenwache-Fragment). Mit starten=False
+    laeuft kein Thread; dann prueft nur, wer pruefe() aufruft (Skripte, Tests).
+    """
+
+    def __init__(self, pfad, intervall=INTERVALL, starten=True):
+        self.pfad = str(pfad)
+        self.intervall = intervall
+        self._sperre = threading.Lock()
+        self._halt = threading.Event()
+        self._kandidat = None
+        self._kennung = self._stat()
+        self.version = versionsmarke(self.pfad)
+        self._thread = None
+        if starten:
+            self._thread = threading.Thread(target=self._lauf, name='masterwaechter', daemon=True)
+            self._thread.start()
+
+    def _stat(self):
+        """mtime und Groesse von CSV und Journal (None, wo eine Datei fehlt)."""
+        kennung = []
+        for p in (self.pfad, journal_pfad(self.pfad)):
+            try:
+                st = os.stat(p)
+            except OSError:
+                kennung.append(None)
+                continue
+            kennung.append((st.st_mtime_ns, st.st_size))
+        return None if kennung[0] is None else tuple(kennung)
+
+    def pruefe(self, sofort=False):
+        """Eine Runde: True, wenn eine neue Version uebernommen wurde.
+
+        Eine geaenderte Kennung wird erst in der naechsten Runde uebernommen,
+        wenn sie sich bis dahin nicht weiter veraendert hat (sofort=True
+        ueberspringt das)."""
+        kennung = self._stat()
+        if kennung is None or kennung == self._kennung:
+            self._kandidat = None
+            return False
+        if not sofort and kennung != self._kandidat:
+            self._kandidat = kennung
+            return False
+        neu = versionsmarke(self.pfad)
+        with self._sperre:
+            self.version = neu
+            self._kennung, self._kandidat = kennung, None
+        return True
+
+    def _lauf(self):
+        while not self._halt.wait(self.intervall):
+            try:
+                self.pruefe()
+            except Exception:   # halbe Datei, Parsefehler: naechste Runde neu versuchen
+                traceback.print_exc(file=sys.stderr)
+                self._kandidat = None
+
+    def anhalten(self):
+        self._halt.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Optionale Zeitmessung in verschachtelten Abschnitten.
+
+Die Module markieren ihre teuren Stufen (Parsen, Auswahl, Abschnitte,
+Diagramme, Arbeitsmappe, Zip-Nachbearbeitung, PDF-Layout) mit spanne()
+oder @gemessen. Gemessen wird nur, wo jemand sammelt:
+
+  with sammeln('PDF Lars 2026') as s:
+      baue_pdf(master, 'Lars', 2026)
+  print(s.bericht())
+
+Ohne aktiven Sammler kostet ein Messpunkt einen ContextVar-Zugriff und
+liefert einen geteilten Leer-Kontext - keine Uhr, keine Allokation. Der
+Sammler haengt am contextvars-Kontext, nicht am Prozess: parallele
+Exporte in anderen Threads messen je fuer sich oder gar nicht.
+"""
+
+import contextlib
+import contextvars
+import functools
+import time
+
+_SAMMLER = contextvars.ContextVar('messung_sammler', default=None)
+
+
+class Spanne:
+    """Ein gemessener Abschnitt mit seinen Unterabschnitten."""
+
+    __slots__ = ('name', 'start', 'dauer', 'kinder')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = 0.0
+        self.dauer = 0.0
+        self.kinder = []
+
+
+class _Leer:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_LEER = _Leer()
+
+
+class _Offen:
+    __slots__ = ('sammler', 'spanne')
+
+    def __init__(self, sammler, name):
+        self.sammler = sammler
+        self.spanne = Spanne(name)
+
+    def __enter__(self):
+        stapel = self.sammler._stapel
+        stapel[-1].kinder.append(self.spanne)
+        stapel.append(self.spanne)
+        self.spanne.start = time.perf_counter()
+        return self.spanne
+
+    def __exit__(self, *exc):
+        self.spanne.dauer = time.perf_counter() - self.spanne.start
+        self.sammler._stapel.pop()
+        return False
+
+
+def spanne(name):
+    """Kontext fuer einen Messabschnitt; ohne Sammler ein Leer-Kontext."""
+    sammler = _SAMMLER.get()
+    return _LEER if sammler is None else _Offen(sammler, name)
+
+
+def gemessen(name):
+    """Dekorator: der ganze Funktionsaufruf als Abschnitt name."""
+    def dekorator(funktion):
+        @functools.wraps(funktion)
+        def huelle(*args, **kwargs):
+            sammler = _SAMMLER.get()
+            if sammler is None:
+                return funktion(*args, **kwargs)
+            with _Offen(sammler, name):
+                return funktion(*args, **kwargs)
+        return huelle
+    return dekorator
+
+
+class Sammler:
+    """Wurzel eines Messbaums; siehe sammeln()."""
+
+    def __init__(self, name):
+        self.wurzel = Spanne(name)
+        self._stapel = [self.wurzel]
+
+    def als_dict(self):
+        """Verdichteter Baum: gleichnamige Geschwister zusammengefasst."""
+        return _verdichte([self.wurzel])[0]
+
+    def bericht(self, breite=28, min_ms=0.05):
+        """Flammengrafik als Text: Einrueckung = Verschachtelung, Balken =
+        Anteil an der Gesamtzeit, '(eigen)' = nicht weiter aufgeteilte Zeit."""
+        baum = self.als_dict()
+        gesamt = baum['ms'] or 1e-9
+        zeilen = []
+
+        def zeile(name, ms, anzahl, tiefe):
+            balken = '█' * max(1, round(breite * ms / gesamt)) if ms >= min_ms else ''
+            mal = f' ×{anzahl}' if anzahl > 1 else ''
+            zeilen.append(f'{"  " * tiefe}{name}{mal}'.ljust(40)
+                          + f'{ms:9.1f} ms {100 * ms / gesamt:5.1f} %  {balken}')
+
+        def knoten(k, tiefe):
+            zeile(k['name'], k['ms'], k['anzahl'], tiefe)
+            if k['kinder']:
+                for kind in k['kinder']:
+                    knoten(kind, tiefe + 1)
+                eigen = k['ms'] - sum(kind['ms'] for kind in k['kinder'])
+                if eigen >= min_ms:
+                    zeile('(eigen)', eigen, 1, tiefe + 1)
+
+        knoten(baum, 0)
+        return '\n'.join(zeilen)
+
+
+def _verdichte(spannen):
+    gruppen = {}
+    for s in spannen:
+        g = gruppen.setdefault(s.name, {'name': s.name, 'ms': 0.0, 'anzahl': 0, '_kinder': []})
+        g['ms'] += s.dauer * 1000
+        g['anzahl'] += 1
+        g['_kinder'] += s.kinder
+    for g in gruppen.values():
+        g['kinder'] = _verdichte(g.pop('_kinder'))
+    return list(gruppen.values())
+
+
+@contextlib.contextmanager
+def sammeln(name='gesamt'):
+    """Schaltet die Messung fuer den aktuellen Kontext ein und gibt den
+    Sammler heraus; nach dem with-Block ist dessen Wurzel abgeschlossen."""
+    sammler = Sammler(name)
+    marke = _SAMMLER.set(sammler)
+    sammler.wurzel.start = time.perf_counter()
+    try:
+        yield sammler
+    finally:
+        sammler.wurzel.dauer = time.perf_counter() - sammler.wurzel.start
+        _SAMMLER.reset(marke)
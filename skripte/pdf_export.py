@@ -6,13 +6,13 @@ dieselben Vergleichsrennen wie im Excel-Export. Die beiden Formate koennen
 dadurch nie auseinanderlaufen.
 """
 
+import contextlib
+import functools
 import io
+import os
 import sys
 
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mticker
+import numpy as np
 import pandas as pd
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A3, landscape
@@ -20,17 +20,18 @@ from reportlab.lib.units import mm
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.enums import TA_LEFT
 from reportlab.platypus import (SimpleDocTemplate, Paragraph, Table, TableStyle,
-                                 Spacer, Image, KeepTogether, PageBreak)
+                                 Spacer, KeepTogether, PageBreak)
 
 from master_io import load_master
-from auswertung import select_season, segmente, abschnittsbezeichnung, label
-
-# Liberation Sans ist metrisch mit Arial/Helvetica kompatibel - so wirken die
-# matplotlib-Diagramme wie aus einem Guss mit der Helvetica-Tabelle daneben,
-# statt wie ein Fremdkoerper in der matplotlib-Standardschrift (DejaVu Sans).
-matplotlib.rcParams['font.family'] = 'sans-serif'
-matplotlib.rcParams['font.sans-serif'] = ['Liberation Sans', 'Arial', 'Helvetica', 'DejaVu Sans']
-matplotlib.rcParams['axes.unicode_minus'] = False
+from messung import gemessen, spanne
+from auswertung import (select_season, abschnitte, abschnitt_zeile, abschnittsbezeichnung,
+                        schnellstes_vollstaendiges)
+from blattlayout import KOPF_RENNEN, KOPF_ERGEBNIS, KOPF_SEGMENT, BREITEN as SPALTENBREITEN
+from diagramme import daten_rueckstand, daten_ermuedung
+from vektordiagramme import vektordiagramm
+# Die PNG-Diagramme der App liegen in diagramme.py; hier re-exportiert, weil
+# Skripte sie seit jeher als pdf_export.grafik_* ansprechen.
+from diagramme import LINIENFARBEN, grafik_rueckstand, grafik_ermuedung  # noqa: F401
 
 TINTE = colors.HexColor('#1F3348')
 GRAU = colors.HexColor('#6B7A8A')
@@ -40,18 +41,9 @@ SCHRITTZEILE = colors.HexColor('#EDF1F5')
 RAND = colors.HexColor('#B8C4D0')
 VERGLEICH_TEXT = colors.HexColor('#5A6B7C')
 
-# Dieselbe Palette wie im Markier-Tool (BAHNFARBEN) - damit Live-Vorschau,
-# xlsx-Kontext und PDF optisch zur selben Familie gehoeren statt matplotlibs
-# generischer Standardfarben (Blau/Orange/Gruen/Rot/Lila).
-LINIENFARBEN = ['#C8571F', '#2E7D6B', '#3B6FA0', '#A0439B', '#B8860B',
-                '#5E8C3F', '#B34A5C', '#3F8C8C', '#6B5B95']
-
-SPALTEN = (['Datum', 'Ort', 'Rd', 'Bahn', 'Rang', 'Zeit', '0–200', '200–400', 'Diff']
-           + ['Start–H1'] + [f'H{i}–H{i+1}' for i in range(1, 10)] + ['H10–Ziel'])
-
-# Spaltenbreiten direkt aus dem Excel-Layout uebernehmen (single source of truth):
-# aendert sich dort etwas, zieht das PDF automatisch mit, statt auseinanderzulaufen.
-from athletenblatt import BREITEN as SPALTENBREITEN
+# Spaltenkoepfe und -breiten aus blattlayout, wie im Excel-Layout (single source
+# of truth): aendert sich dort etwas, zieht das PDF automatisch mit.
+SPALTEN = KOPF_RENNEN + KOPF_ERGEBNIS + KOPF_SEGMENT
 
 # Gruppenkopf ueber den Spaltentiteln, wie in Zeile 7 des Excel-Blatts.
 # (Spalte von, Spalte bis, Beschriftung) - 0-basiert.
@@ -79,34 +71,40 @@ def zeitzeile(row):
     return fmt(row['zeit'])
 
 
-def h200_h400_diff(row):
-    h5, h6, zeit = row.get('h5'), row.get('h6'), row.get('zeit')
-    if pd.isna(h5) or pd.isna(h6):
+def _wert(v):
+    """NaN aus den abschnitte()-Arrays als None, sonst float."""
+    return None if np.isnan(v) else float(v)
+
+
+def h200_h400_diff(werte):
+    """0-200, 200-400 und Diff auf 2 Stellen, aus einer abschnitte()-Zeile."""
+    m200, m400, diff = (_wert(v) for v in werte['splits'])
+    if m200 is None:
         return None, None, None
-    m200 = h5 + (h6 - h5) * 14 / 35
-    if pd.isna(zeit):
+    if m400 is None:
         return round(m200, 2), None, None
-    m400 = zeit - m200
-    return round(m200, 2), round(m400, 2), round(m400 - m200, 2)
+    return round(m200, 2), round(m400, 2), round(diff, 2)
 
 
-def rennzeilen(row, mit_athlet=False):
+def rennzeilen(row, mit_athlet=False, werte=None):
     """Zwei Tabellenzeilen (Zeit, Schritte) fuer ein Rennen.
 
     mit_athlet=True stellt den Namen voran - noetig, wenn eine Tabelle
     Rennen verschiedener Athlet:innen nebeneinander zeigt.
+    werte: die Zeile dieses Rennens aus abschnitte() (abschnitt_zeile) -
+    wer viele Rennen ausgibt, rechnet einmal fuer alle vor. Ohne wird sie
+    hier fuer die eine Zeile berechnet.
     """
-    seg, schritte = segmente(row)
-    m200, m400, diff = h200_h400_diff(row)
+    if werte is None:
+        werte = abschnitt_zeile(abschnitte(pd.DataFrame([row])), 0)
+    seg = [_wert(v) for v in werte['seg']]
+    schritte = [_wert(v) for v in werte['schritte']]
+    m200, m400, diff = h200_h400_diff(werte)
 
     # Zwischenzeit (Zeit seit Start) je Abschnittsende, fuer die Klammer-
     # Anzeige "Segment (Zwischenzeit)". Start-H1 bekommt keine Klammer,
     # da Segment und Zwischenzeit dort identisch waeren.
-    def f(v):
-        return None if v is None or (isinstance(v, float) and pd.isna(v)) else float(v)
-    h = [f(row.get(f'h{i}')) for i in range(1, 11)]
-    zeit_num = f(row.get('zeit'))
-    zwischen = [h[0]] + h[1:10] + [zeit_num]
+    zwischen = [_wert(v) for v in werte['zwischen']]
 
     def segfmt(i):
         if seg[i] is None:
@@ -128,328 +126,321 @@ def rennzeilen(row, mit_athlet=False):
     return zeile1, zeile2
 
 
-def grafikseite(doc, bild1, bild2):
+def grafikseite(doc, daten1, daten2):
     """Beide Diagramme zusammen auf einer eigenen Seite, gross und mittig.
 
     Vorher lag jedes Diagramm einzeln bei 35% der Seitenhoehe, oft ueber zwei
     Seiten verteilt (eines gequetscht unter der Tabelle, eines allein auf der
     naechsten, grossteils leeren Seite). Jetzt: erzwungener Seitenumbruch,
-    beide Bilder auf voller Breite gestapelt - nutzt die A3-Seite tatsaechlich.
+    beide Diagramme auf voller Breite gestapelt - nutzt die A3-Seite tatsaechlich.
+    daten1/daten2 kommen aus diagramme.daten_*, gezeichnet wird als Vektorgrafik.
     """
-    elemente = [e for e in (bild1, bild2) if e]
+    elemente = [e for e in (daten1, daten2) if e]
     if not elemente:
         return []
     breite = doc.width * 0.78
-    hoehe = breite * 0.40   # entspricht dem matplotlib-Seitenverhaeltnis (9 x 3.6)
     story = [PageBreak()]
-    for i, bild in enumerate(elemente):
-        story.append(Image(bild, width=breite, height=hoehe))
+    for i, daten in enumerate(elemente):
+        story.append(vektordiagramm(daten, breite))
         if i < len(elemente) - 1:
             story.append(Spacer(1, 14))
     return story
 
 
-def baue_pdf(master, athlet, saison, vergleiche=4):
-    auswahl = select_season(master, athlet, saison, vergleiche)
+HINWEIS_SAISON = ('Je Rennen zwei Zeilen: oben die Abschnittszeit mit Zwischenzeit seit Start in '
+                  'Klammern, darunter die Schrittzahl im gleichen Abschnitt.   Goldener Rahmen = '
+                  'persönliche Bestzeit.')
+HINWEIS_AUSWAHL = ('Je Rennen zwei Zeilen: oben die Abschnittszeit mit Zwischenzeit seit Start in '
+                   'Klammern, darunter die Schrittzahl im gleichen Abschnitt.')
+
+
+class Berichtsvorlage:
+    """Der datenunabhaengige Teil des PDF-Layouts, einmal je Prozess gebaut.
+
+    Absatzstile, Spaltenbreiten (aus blattlayout.BREITEN), Kopfzeilen und
+    der Grundstil der Rennliste sind fuer jeden Bericht gleich; baue_pdf und
+    baue_pdf_auswahl holen sie ueber vorlage() statt sie je Aufruf neu
+    aufzubauen. Je Bericht bleiben nur die datenabhaengigen Stilbefehle der
+    Rennzeilen (rennstil).
+
+    mit_athlet=True ist die Variante fuer frei gewaehlte Rennen: vorne eine
+    zusaetzliche Spalte "Läufer:in", dafuer kein Gruppenkopf.
+    """
+
+    RAND = 12 * mm
+
+    def __init__(self, mit_athlet=False):
+        self.mit_athlet = mit_athlet
+        self.pagesize = landscape(A3)
+        self.breite = self.pagesize[0] - 2 * self.RAND
+        self.styles = {
+            'titel': ParagraphStyle('titel', fontName='Helvetica-Bold', fontSize=18,
+                                    textColor=colors.white, leading=22),
+            'kpi_l': ParagraphStyle('kpi_l', fontName='Helvetica', fontSize=8, textColor=GRAU),
+            'kpi_v': ParagraphStyle('kpi_v', fontName='Helvetica-Bold', fontSize=13, textColor=TINTE),
+            'hinweis': ParagraphStyle('hinweis', fontName='Helvetica', fontSize=7.5, textColor=GRAU),
+            'block': ParagraphStyle('block', fontName='Helvetica-Bold', fontSize=8.5,
+                                    textColor=colors.white),
+        }
+        self.titelstil = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), TINTE),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10), ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ])
+        self.kpistil = TableStyle([('LEFTPADDING', (0, 0), (-1, -1), 2),
+                                   ('TOPPADDING', (0, 0), (-1, -1), 1)])
+
+        # Dieselben Breiten wie im Excel, bei mit_athlet plus eine Athletenspalte vorne
+        o = 1 if mit_athlet else 0
+        breiten_roh = [14] * o + list(SPALTENBREITEN)
+        skala = self.breite / sum(breiten_roh)
+        self.breiten = [b * skala for b in breiten_roh]
+
+        kopf = []
+        if mit_athlet:
+            self.kopfzeilen = [['Läufer:in'] + SPALTEN]
+        else:
+            gruppenzeile = [''] * len(SPALTEN)
+            for von, _bis, titel in GRUPPEN:
+                gruppenzeile[von] = titel
+            self.kopfzeilen = [gruppenzeile, SPALTEN]
+            kopf = [
+                # Gruppenkopf (Zeile 0) - dunkel, wie Zeile 7 im Excel
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 8),
+                ('BACKGROUND', (0, 0), (-1, 0), TINTE),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ]
+        # Spaltentitel - hell, wie Zeile 8 im Excel
+        k = len(self.kopfzeilen) - 1
+        self.grundstil = kopf + [
+            ('FONTNAME', (0, k), (-1, k), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, k), (-1, k), 8),
+            ('BACKGROUND', (0, k), (-1, k), KOPF_HELL),
+            ('TEXTCOLOR', (0, k), (-1, k), TINTE),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 7.5),
+            ('ALIGN', (3 + o, 0), (-1, -1), 'CENTER'),
+            ('ALIGN', (0, 0), (1 + o, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('GRID', (0, 0), (-1, -1), 0.4, RAND),
+            ('TOPPADDING', (0, 0), (-1, -1), 2), ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ('LEFTPADDING', (0, 0), (-1, -1), 3), ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+        ]
+        if not mit_athlet:
+            self.grundstil += [('SPAN', (von, 0), (bis, 0)) for von, bis, _t in GRUPPEN]
+
+        # Spalten je Rennen: verbunden (Rennen/Ergebnis), Zeit, ab hier Abschnitte
+        self.verbunden = list(range(0, 9 + o))
+        self.c_zeit = 5 + o
+        self.c_abschnitt = 9 + o
+
+    def dokument(self, ziel, titel):
+        return SimpleDocTemplate(
+            ziel, pagesize=self.pagesize,
+            leftMargin=self.RAND, rightMargin=self.RAND, topMargin=self.RAND,
+            bottomMargin=self.RAND, title=titel)
+
+    def titelleiste(self, text):
+        tbl = Table([[Paragraph(text, self.styles['titel'])]], colWidths=[self.breite])
+        tbl.setStyle(self.titelstil)
+        return tbl
+
+    def rennstil(self, r0, ist_pb=None, ist_vgl=None):
+        """Stilbefehle fuer die Rennbloecke, aus der Beschreibung als Arrays:
+        r0 - Tabellenzeile der oberen Zeile je Rennen, ist_pb/ist_vgl - Flags
+        je Rennen (Standard: alle False)."""
+        r0 = np.asarray(r0, dtype=int)
+        ist_pb = np.zeros(len(r0), bool) if ist_pb is None else np.asarray(ist_pb, bool)
+        ist_vgl = np.zeros(len(r0), bool) if ist_vgl is None else np.asarray(ist_vgl, bool)
+        letzte = self.verbunden[-1]
+        stil = []
+        for z, pb, vgl in zip(r0.tolist(), ist_pb.tolist(), ist_vgl.tolist()):
+            stil += [('SPAN', (c, z), (c, z + 1)) for c in self.verbunden]
+            # Graue Schrittzeilen-Fuellung nur ab den Abschnittsspalten -
+            # Rennen/Ergebnis sind mit der oberen Zeile verbunden und
+            # duerfen hier nicht mit uebermalt werden.
+            stil.append(('BACKGROUND', (self.c_abschnitt, z + 1), (-1, z + 1), SCHRITTZEILE))
+            stil.append(('FONTNAME', (self.c_zeit, z), (self.c_zeit, z), 'Helvetica-Bold'))
+            if vgl:
+                stil.append(('TEXTCOLOR', (0, z), (-1, z), VERGLEICH_TEXT))
+                stil.append(('FONTNAME', (0, z), (1, z), 'Helvetica-Oblique'))
+            if pb:
+                # Rahmen um den ganzen Rennblock, Faellung nur RENNEN+ERGEBNIS
+                # (bis "Diff"), analog zum Excel-Export.
+                stil.append(('BOX', (0, z), (-1, z + 1), 1.4, GOLD))
+                stil.append(('BACKGROUND', (0, z), (letzte, z + 1), GOLD_HELL))
+        return stil
+
+    def tabelle(self, daten, stil):
+        tbl = Table(daten, colWidths=self.breiten, repeatRows=len(self.kopfzeilen))
+        tbl.setStyle(TableStyle(self.grundstil + stil))
+        return tbl
+
+
+@functools.lru_cache(maxsize=None)
+def vorlage(mit_athlet=False):
+    """Die prozessweit geteilte Berichtsvorlage (siehe Berichtsvorlage)."""
+    return Berichtsvorlage(mit_athlet)
+
+
+class _Senke:
+    """Reicht write() an das eigentliche Ziel durch und zaehlt die Bytes mit."""
+
+    def __init__(self, ziel):
+        self.ziel = ziel
+        self.bytes = 0
+        self.name = getattr(ziel, 'name', None)
+
+    def write(self, daten):
+        self.bytes += len(daten)
+        return self.ziel.write(daten)
+
+
+@contextlib.contextmanager
+def _senke(ziel):
+    """Dateipfad oder beschreibbares Objekt (Datei, Socket-Datei, Spool, BytesIO).
+    Pfade werden erst nach erfolgreichem Build an ihren Platz geschoben, damit
+    ein abgebrochener Bericht keine halbe PDF hinterlaesst."""
+    if not isinstance(ziel, (str, os.PathLike)):
+        yield _Senke(ziel)
+        return
+    tmp = f'{os.fspath(ziel)}.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            yield _Senke(f)
+        os.replace(tmp, ziel)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _bauen(v, ziel, titel, story_fuer):
+    """Baut das Dokument direkt in ziel; story_fuer(doc) liefert den Inhalt.
+    Gibt die Metadaten (seiten, bytes) zurueck."""
+    with _senke(ziel) as senke:
+        doc = v.dokument(senke, titel)
+        with spanne('pdf.layout'):
+            doc.build(story_fuer(doc))
+    return {'seiten': doc.page, 'bytes': senke.bytes}
+
+
+@gemessen('pdf.bericht')
+def schreibe_pdf(master, athlet, saison, ziel, vergleiche=4, index=None):
+    """Schreibt die Saisonauswertung direkt nach ziel (Pfad oder beschreibbares
+    Objekt) und gibt nur Metadaten zurueck: seiten, bytes, rennen."""
+    auswahl = select_season(master, athlet, saison, vergleiche, index=index)
     lauf, vgl = auswahl['lauf'], auswahl['vgl']
     sb, pb, pb_jahr, pb_id = auswahl['sb'], auswahl['pb'], auswahl['pb_jahr'], auswahl['pb_id']
 
-    buffer = io.BytesIO()
-    pagesize = landscape(A3)
-    doc = SimpleDocTemplate(
-        buffer, pagesize=pagesize,
-        leftMargin=12 * mm, rightMargin=12 * mm, topMargin=12 * mm, bottomMargin=12 * mm,
-        title=f'{athlet} – 400 m Hürden – Saison {saison}')
-
-    styles = {
-        'titel': ParagraphStyle('titel', fontName='Helvetica-Bold', fontSize=18,
-                                textColor=colors.white, leading=22),
-        'kpi_l': ParagraphStyle('kpi_l', fontName='Helvetica', fontSize=8, textColor=GRAU),
-        'kpi_v': ParagraphStyle('kpi_v', fontName='Helvetica-Bold', fontSize=13, textColor=TINTE),
-        'hinweis': ParagraphStyle('hinweis', fontName='Helvetica', fontSize=7.5, textColor=GRAU),
-        'block': ParagraphStyle('block', fontName='Helvetica-Bold', fontSize=8.5,
-                                textColor=colors.white),
-    }
-
-    story = []
-
-    kopf_tbl = Table([[Paragraph(f'{athlet.upper()}   ·   400 M HÜRDEN   ·   SAISON {saison}',
-                                 styles['titel'])]], colWidths=[doc.width])
-    kopf_tbl.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), TINTE),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10), ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    story.append(kopf_tbl)
-    story.append(Spacer(1, 4))
+    v = vorlage()
+    story = [v.titelleiste(f'{athlet.upper()}   ·   400 M HÜRDEN   ·   SAISON {saison}'),
+             Spacer(1, 4)]
 
     kpis = [('Saisonbestzeit', f'{sb:.2f} s' if pd.notna(sb) else '—'),
             ('Persönliche Bestzeit', f'{pb:.2f} s' if pd.notna(pb) else '—'),
             ('Jahr', str(pb_jahr) if pb_jahr else '—'),
             ('Rennen in der Saison', str(len(lauf))),
             ('Beendet', str(int((lauf['status'] == 'OK').sum())))]
-    kpi_row = [[Paragraph(t, styles['kpi_l'])] + [Paragraph(w, styles['kpi_v'])]
-               for t, w in kpis]
-    kpi_tbl = Table([[Paragraph(t, styles['kpi_l']) for t, _ in kpis],
-                     [Paragraph(w, styles['kpi_v']) for _, w in kpis]],
-                    colWidths=[doc.width / len(kpis)] * len(kpis))
-    kpi_tbl.setStyle(TableStyle([('LEFTPADDING', (0, 0), (-1, -1), 2),
-                                 ('TOPPADDING', (0, 0), (-1, -1), 1)]))
+    kpi_tbl = Table([[Paragraph(t, v.styles['kpi_l']) for t, _ in kpis],
+                     [Paragraph(w, v.styles['kpi_v']) for _, w in kpis]],
+                    colWidths=[v.breite / len(kpis)] * len(kpis))
+    kpi_tbl.setStyle(v.kpistil)
     story.append(kpi_tbl)
-    story.append(Paragraph('Je Rennen zwei Zeilen: oben die Abschnittszeit mit Zwischenzeit seit Start in Klammern, darunter die '
-                           'Schrittzahl im gleichen Abschnitt.   Goldener Rahmen = '
-                           'persönliche Bestzeit.', styles['hinweis']))
+    story.append(Paragraph(HINWEIS_SAISON, v.styles['hinweis']))
     story.append(Spacer(1, 6))
 
     # ---------- Tabelle ----------
-    gruppenzeile = [''] * len(SPALTEN)
-    for von, _bis, titel in GRUPPEN:
-        gruppenzeile[von] = titel
-    daten = [gruppenzeile, SPALTEN]
-    zeilen_meta = []   # (zeile_index_zeit, ist_pb, ist_vergleich)
-    for _, r in lauf.iterrows():
-        z1, z2 = rennzeilen(r)
-        zeilen_meta.append((len(daten), r['race_id'] == pb_id, False))
-        daten += [z1, z2]
+    daten = list(v.kopfzeilen)
+    werte = abschnitte(lauf)
+    for k, (_, r) in enumerate(lauf.iterrows()):
+        daten += rennzeilen(r, werte=abschnitt_zeile(werte, k))
+    r0 = len(v.kopfzeilen) + 2 * np.arange(len(lauf))
+    ist_vgl = np.zeros(len(lauf), bool)
+    ids = list(lauf['race_id'])
+    vgl_kopf_idx = None
     if not vgl.empty:
         daten.append(['VERGLEICH FRÜHERE JAHRE · bestes Rennen je Saison, neuestes zuerst']
                      + [''] * (len(SPALTEN) - 1))
         vgl_kopf_idx = len(daten) - 1
-        for _, r in vgl.iterrows():
-            z1, z2 = rennzeilen(r)
-            zeilen_meta.append((len(daten), r['race_id'] == pb_id, True))
-            daten += [z1, z2]
-    else:
-        vgl_kopf_idx = None
-
-    skala = doc.width / sum(SPALTENBREITEN)
-    breiten = [b * skala for b in SPALTENBREITEN]
-
-    tbl = Table(daten, colWidths=breiten, repeatRows=2)
-    stil = [
-        # Gruppenkopf (Zeile 0) - dunkel, wie Zeile 7 im Excel
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 8),
-        ('BACKGROUND', (0, 0), (-1, 0), TINTE),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        # Spaltentitel (Zeile 1) - hell, wie Zeile 8 im Excel
-        ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 1), (-1, 1), 8),
-        ('BACKGROUND', (0, 1), (-1, 1), KOPF_HELL),
-        ('TEXTCOLOR', (0, 1), (-1, 1), TINTE),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 7.5),
-        ('ALIGN', (3, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (0, 0), (1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.4, RAND),
-        ('TOPPADDING', (0, 0), (-1, -1), 2), ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3), ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-    ]
-    for von, bis, _t in GRUPPEN:
-        stil.append(('SPAN', (von, 0), (bis, 0)))
-    for i, (r0, ist_pb, ist_vgl) in enumerate(zeilen_meta):
-        stil.append(('SPAN', (0, r0), (0, r0 + 1)))
-        stil.append(('SPAN', (1, r0), (1, r0 + 1)))
-        for c in (2, 3, 4, 5, 6, 7, 8):
-            stil.append(('SPAN', (c, r0), (c, r0 + 1)))
-        # Graue Schrittzeilen-Fuellung nur ab den Abschnittsspalten (Index 9) -
-        # Rennen/Ergebnis (0-8) sind mit der oberen Zeile verbunden und
-        # duerfen hier nicht mit uebermalt werden.
-        stil.append(('BACKGROUND', (9, r0 + 1), (-1, r0 + 1), SCHRITTZEILE))
-        stil.append(('FONTNAME', (5, r0), (5, r0), 'Helvetica-Bold'))
-        if ist_vgl:
-            stil.append(('TEXTCOLOR', (0, r0), (-1, r0), VERGLEICH_TEXT))
-            stil.append(('FONTNAME', (0, r0), (1, r0), 'Helvetica-Oblique'))
-        if ist_pb:
-            # Rahmen um den ganzen Rennblock, Faellung nur RENNEN+ERGEBNIS
-            # (bis Spalte 9 "Diff"), analog zum Excel-Export.
-            stil.append(('BOX', (0, r0), (-1, r0 + 1), 1.4, GOLD))
-            stil.append(('BACKGROUND', (0, r0), (8, r0 + 1), GOLD_HELL))
+        werte = abschnitte(vgl)
+        for k, (_, r) in enumerate(vgl.iterrows()):
+            daten += rennzeilen(r, werte=abschnitt_zeile(werte, k))
+        r0 = np.concatenate([r0, vgl_kopf_idx + 1 + 2 * np.arange(len(vgl))])
+        ist_vgl = np.concatenate([ist_vgl, np.ones(len(vgl), bool)])
+        ids += list(vgl['race_id'])
+
+    stil = v.rennstil(r0, ist_pb=np.array(ids, dtype=object) == pb_id, ist_vgl=ist_vgl)
     if vgl_kopf_idx is not None:
         stil.append(('SPAN', (0, vgl_kopf_idx), (-1, vgl_kopf_idx)))
         stil.append(('BACKGROUND', (0, vgl_kopf_idx), (-1, vgl_kopf_idx), GRAU))
         stil.append(('TEXTCOLOR', (0, vgl_kopf_idx), (-1, vgl_kopf_idx), colors.white))
         stil.append(('FONTNAME', (0, vgl_kopf_idx), (-1, vgl_kopf_idx), 'Helvetica-Bold'))
-    tbl.setStyle(TableStyle(stil))
-    story.append(tbl)
+    story.append(v.tabelle(daten, stil))
     story.append(Spacer(1, 10))
 
     # ---------- Grafiken ----------
     reihenfolge = pd.concat([lauf, vgl]) if not vgl.empty else lauf
-    bild1 = grafik_rueckstand(lauf, auswahl['ref'])
-    bild2 = grafik_ermuedung(reihenfolge)
-    story += grafikseite(doc, bild1, bild2)
+    diagramm1 = daten_rueckstand(lauf, auswahl['ref'])
+    diagramm2 = daten_ermuedung(reihenfolge)
+
+    meta = _bauen(v, ziel, f'{athlet} – 400 m Hürden – Saison {saison}',
+                  lambda doc: story + grafikseite(doc, diagramm1, diagramm2))
+    meta['rennen'] = len(reihenfolge)
+    return meta
 
-    doc.build(story)
+
+def baue_pdf(master, athlet, saison, vergleiche=4, index=None):
+    """Wie schreibe_pdf, aber als BytesIO (Leseposition 0)."""
+    buffer = io.BytesIO()
+    schreibe_pdf(master, athlet, saison, buffer, vergleiche, index=index)
     buffer.seek(0)
     return buffer
 
 
-def baue_pdf_auswahl(master, race_ids, titel='Rennvergleich'):
+@gemessen('pdf.auswahl')
+def schreibe_pdf_auswahl(master, race_ids, ziel, titel='Rennvergleich'):
     """PDF fuer eine frei zusammengestellte Rennauswahl - unabhaengig von
     Athlet oder Saison. Fuer den Vergleich-Reiter: Trainer waehlen einzelne
-    Rennen (auch verschiedener Athlet:innen) und exportieren die Auswahl."""
+    Rennen (auch verschiedener Athlet:innen) und exportieren die Auswahl.
+    Schreibt wie schreibe_pdf direkt nach ziel und gibt Metadaten zurueck."""
     rows = master[master['race_id'].isin(race_ids)].copy()
     if rows.empty:
         raise ValueError('Keine der gewaehlten Rennen wurde im Master gefunden.')
     rows['_ord'] = rows['race_id'].map({r: i for i, r in enumerate(race_ids)})
     rows = rows.sort_values('_ord')
 
-    vollstaendig = [r for _, r in rows.iterrows()
-                    if r['status'] == 'OK' and all(pd.notna(r[f'h{i}']) for i in range(1, 11))]
-    ref = min(vollstaendig, key=lambda r: float(r['zeit'])) if vollstaendig else None
+    ref = schnellstes_vollstaendiges(rows)
 
-    buffer = io.BytesIO()
-    pagesize = landscape(A3)
-    doc = SimpleDocTemplate(
-        buffer, pagesize=pagesize,
-        leftMargin=12 * mm, rightMargin=12 * mm, topMargin=12 * mm, bottomMargin=12 * mm,
-        title=titel)
-
-    styles = {
-        'titel': ParagraphStyle('titel', fontName='Helvetica-Bold', fontSize=18,
-                                textColor=colors.white, leading=22),
-        'hinweis': ParagraphStyle('hinweis', fontName='Helvetica', fontSize=7.5, textColor=GRAU),
-    }
-    story = []
-
-    kopf_tbl = Table([[Paragraph(titel.upper() + '   ·   400 M HÜRDEN', styles['titel'])]],
-                     colWidths=[doc.width])
-    kopf_tbl.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), TINTE),
-        ('LEFTPADDING', (0, 0), (-1, -1), 10), ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    story.append(kopf_tbl)
-    story.append(Spacer(1, 6))
-    story.append(Paragraph(f'{len(rows)} frei gewählte Rennen.   Je Rennen zwei Zeilen: oben die '
-                           'Abschnittszeit mit Zwischenzeit seit Start in Klammern, darunter die Schrittzahl '
-                           'im gleichen Abschnitt.',
-                           styles['hinweis']))
-    story.append(Spacer(1, 6))
+    v = vorlage(mit_athlet=True)
+    story = [v.titelleiste(titel.upper() + '   ·   400 M HÜRDEN'), Spacer(1, 6),
+             Paragraph(f'{len(rows)} frei gewählte Rennen.   {HINWEIS_AUSWAHL}',
+                       v.styles['hinweis']),
+             Spacer(1, 6)]
 
-    spalten = ['Läufer:in'] + SPALTEN
-    daten = [spalten]
-    for _, r in rows.iterrows():
-        z1, z2 = rennzeilen(r, mit_athlet=True)
-        daten += [z1, z2]
-
-    # Dieselben Breiten wie im Excel/Saison-PDF, plus eine Athletenspalte vorne
-    breiten_roh = [14] + list(SPALTENBREITEN)
-    skala = doc.width / sum(breiten_roh)
-    breiten = [b * skala for b in breiten_roh]
-
-    tbl = Table(daten, colWidths=breiten, repeatRows=1)
-    stil = [
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 8),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#DCE3EA')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), TINTE),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 7.5),
-        ('ALIGN', (4, 0), (-1, -1), 'CENTER'),
-        ('ALIGN', (0, 0), (2, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.4, RAND),
-        ('TOPPADDING', (0, 0), (-1, -1), 2), ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3), ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-    ]
-    for i in range(len(rows)):
-        r0 = 1 + i * 2
-        for c in (0, 1, 2, 3, 4, 5, 6, 7, 8, 9):
-            stil.append(('SPAN', (c, r0), (c, r0 + 1)))
-        # Rennen/Ergebnis (Spalten 0-9, inkl. Laeufer:in) sind mit der oberen
-        # Zeile verbunden - graue Fuellung erst ab den Abschnittsspalten.
-        stil.append(('BACKGROUND', (10, r0 + 1), (-1, r0 + 1), SCHRITTZEILE))
-        stil.append(('FONTNAME', (6, r0), (6, r0), 'Helvetica-Bold'))
-    tbl.setStyle(TableStyle(stil))
-    story.append(tbl)
+    daten = list(v.kopfzeilen)
+    werte = abschnitte(rows)
+    for k, (_, r) in enumerate(rows.iterrows()):
+        daten += rennzeilen(r, mit_athlet=True, werte=abschnitt_zeile(werte, k))
+    stil = v.rennstil(len(v.kopfzeilen) + 2 * np.arange(len(rows)))
+    story.append(v.tabelle(daten, stil))
     story.append(Spacer(1, 10))
 
-    bild1 = grafik_rueckstand(rows, ref)
-    bild2 = grafik_ermuedung(rows)
-    story += grafikseite(doc, bild1, bild2)
+    diagramm1 = daten_rueckstand(rows, ref)
+    diagramm2 = daten_ermuedung(rows)
 
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
+    meta = _bauen(v, ziel, titel, lambda doc: story + grafikseite(doc, diagramm1, diagramm2))
+    meta['rennen'] = len(rows)
+    return meta
 
 
-def _stil_achse(ax):
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.spines['left'].set_color('#B8C4D0')
-    ax.spines['bottom'].set_color('#B8C4D0')
-    ax.tick_params(colors='#3D4B59', labelsize=8.5)
-    ax.grid(axis='y', color='#D8DEE4', linewidth=0.9)
-    ax.set_axisbelow(True)
-
-
-def grafik_rueckstand(lauf, ref):
-    if ref is None or lauf.empty:
-        return None
-    fig, ax = plt.subplots(figsize=(9, 3.6), dpi=150)
-    x = list(range(1, 12))
-    xt = [f'H{i}' for i in range(1, 11)] + ['Ziel']
-    ref_h = [ref.get(f'h{i}') for i in range(1, 11)] + [ref.get('zeit')]
-
-    for i, (_, r) in enumerate(lauf.iterrows()):
-        h = [r.get(f'h{i}') for i in range(1, 11)] + [r.get('zeit')]
-        y = [(a - b) if pd.notna(a) and pd.notna(b) else float('nan')
-             for a, b in zip(h, ref_h)]
-        ax.plot(x, y, marker='o', markersize=3, linewidth=2.0,
-                color=LINIENFARBEN[i % len(LINIENFARBEN)], label=label(r))
-
-    ax.axhline(0, color='#B3261E', linewidth=1.2, alpha=0.55)
-    ax.set_xticks(x, xt)
-    ax.set_ylabel('Sekunden', fontsize=8.5)
-    ref_name = f"{pd.to_datetime(ref['datum']).strftime('%d.%m.%y')} {ref['ort']} — {float(ref['zeit']):.2f} s"
-    ax.set_title(f'Wo wird die Zeit gewonnen und verloren?   Referenz: {ref_name}   ·   '
-                'unter der Nulllinie = schneller', fontsize=11, fontweight='bold',
-                color='#1F3348', pad=12)
-    _stil_achse(ax)
-    ax.legend(fontsize=8, frameon=False, loc='upper left', bbox_to_anchor=(1.01, 1.0))
-    fig.tight_layout()
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png', bbox_inches='tight', dpi=150)
-    plt.close(fig)
-    buf.seek(0)
-    return buf
-
-
-def grafik_ermuedung(rennen):
-    if rennen.empty:
-        return None
-    fig, ax = plt.subplots(figsize=(9, 3.6), dpi=150)
-    x = list(range(1, 10))
-    xt = [f'H{i}–H{i+1}' for i in range(1, 10)]
-
-    i = 0
-    for _, r in rennen.iterrows():
-        seg, _ = segmente(r)
-        kern = [v for v in seg[1:10] if v is not None]
-        if not kern:
-            continue
-        m = min(kern)
-        y = [v - m if v is not None else float('nan') for v in seg[1:10]]
-        ax.plot(x, y, marker='o', markersize=3, linewidth=2.0,
-                color=LINIENFARBEN[i % len(LINIENFARBEN)], label=label(r))
-        i += 1
-
-    ax.set_xticks(x, xt)
-    ax.set_ylabel('Sekunden langsamer', fontsize=8.5)
-    ax.set_title('Ermüdungsprofil — Verlust gegenüber dem eigenen schnellsten Abschnitt',
-                fontsize=11, fontweight='bold', color='#1F3348', pad=12)
-    _stil_achse(ax)
-    ax.legend(fontsize=8, frameon=False, loc='upper left', bbox_to_anchor=(1.01, 1.0))
-    fig.tight_layout()
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png', bbox_inches='tight', dpi=150)
-    plt.close(fig)
-    buf.seek(0)
-    return buf
+def baue_pdf_auswahl(master, race_ids, titel='Rennvergleich'):
+    """Wie schreibe_pdf_auswahl, aber als BytesIO (Leseposition 0)."""
+    buffer = io.BytesIO()
+    schreibe_pdf_auswahl(master, race_ids, buffer, titel)
+    buffer.seek(0)
+    return buffer
 
 
 if __name__ == '__main__':
@@ -457,8 +448,6 @@ if __name__ == '__main__':
     saison = int(sys.argv[2]) if len(sys.argv) > 2 else 2026
     quelle = sys.argv[3] if len(sys.argv) > 3 else 'data/master.csv'
     master = load_master(quelle)
-    buf = baue_pdf(master, athlet, saison)
     ziel = f'{athlet}_400mH_{saison}.pdf'
-    with open(ziel, 'wb') as f:
-        f.write(buf.read())
+    schreibe_pdf(master, athlet, saison, ziel)
     print(ziel)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Erzeugt am Saisonende Excel- und PDF-Auswertung fuer alle Athlet:innen.
+
+Der Master wird einmal geladen und je Arbeitsprozess einmal uebergeben
+(nicht je Auftrag); jeder Prozess baut daraus einmal seinen MasterIndex.
+Die einzelnen baue()/baue_pdf()-Auftraege laufen dann parallel in einem
+ProcessPoolExecutor. Am Ende steht je Auftrag Dauer und ggf. Fehler.
+
+  python skripte/saisonberichte.py 2026
+  python skripte/saisonberichte.py 2026 --ziel berichte --worker 4 --athlet Lars --athlet Kaja
+  python skripte/saisonberichte.py 2026 --athlet Lars --messung
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from master_io import load_master
+from messung import sammeln
+
+FORMATE = ('xlsx', 'pdf')
+
+# Je Arbeitsprozess einmal gesetzt (siehe _starte_worker)
+_MASTER = None
+_INDEX = None
+
+
+def _starte_worker(master):
+    global _MASTER, _INDEX
+    from auswertung import MasterIndex
+    _MASTER = master
+    _INDEX = MasterIndex(master)
+
+
+def _auftrag(art, athlet, saison, ziel, messen=False):
+    """Ein Export im Arbeitsprozess. Gibt (art, athlet, ziel, sekunden, fehler,
+    messung) zurueck; messung ist die Zeitaufschluesselung als Text oder None."""
+    start = time.perf_counter()
+    messung = None
+    try:
+        with sammeln(f'{art} {athlet} {saison}') if messen else contextlib.nullcontext() as sammler:
+            if art == 'xlsx':
+                from athletenblatt import baue
+                baue(_MASTER, athlet, saison, ziel, index=_INDEX)
+            else:
+                from pdf_export import schreibe_pdf
+                schreibe_pdf(_MASTER, athlet, saison, ziel, index=_INDEX)
+        if sammler is not None:
+            messung = sammler.bericht()
+        fehler = None
+    except Exception as e:   # ein kaputtes Rennen soll nicht den ganzen Lauf abbrechen
+        fehler = f'{type(e).__name__}: {e}'
+        traceback.print_exc(file=sys.stderr)
+    return art, athlet, ziel, time.perf_counter() - start, fehler, messung
+
+
+def athleten_der_saison(master, saison):
+    """Alle Athlet:innen mit mindestens einem Rennen in der Saison, alphabetisch."""
+    return sorted(master.loc[master['_jahr'] == saison, 'athlet'].dropna().unique())
+
+
+def erzeuge(master, saison, zielordner, athleten=None, formate=FORMATE, worker=None,
+            messen=False):
+    """Baut alle Exporte parallel. Gibt die Ergebnisliste von _auftrag zurueck,
+    in der Reihenfolge (Athlet, Format)."""
+    athleten = athleten or athleten_der_saison(master, saison)
+    zielordner = Path(zielordner)
+    zielordner.mkdir(parents=True, exist_ok=True)
+    auftraege = [(art, a, saison, str(zielordner / f'{a}_400mH_{saison}.{art}'))
+                 for a in athleten for art in formate]
+    if not auftraege:
+        return []
+
+    worker = min(worker or os.cpu_count() or 1, len(auftraege))
+    ergebnisse = {}
+    with ProcessPoolExecutor(max_workers=worker, initializer=_starte_worker,
+                             initargs=(master,)) as pool:
+        laufend = {pool.submit(_auftrag, *a, messen): a for a in auftraege}
+        for f in as_completed(laufend):
+            ergebnisse[laufend[f]] = f.result()
+    return [ergebnisse[a] for a in auftraege]
+
+
+def zusammenfassung(ergebnisse, gesamt):
+    zeilen = []
+    for art, athlet, ziel, dauer, fehler, _ in ergebnisse:
+        if fehler:
+            zeilen.append(f'  FEHLER {dauer:6.2f} s  {art:4}  {athlet}  -  {fehler}')
+        else:
+            zeilen.append(f'  ok     {dauer:6.2f} s  {art:4}  {ziel}')
+    n_fehler = sum(1 for e in ergebnisse if e[4])
+    summe = sum(e[3] for e in ergebnisse)
+    zeilen.append(f'{len(ergebnisse)} Exporte in {gesamt:.1f} s (Summe Einzelzeiten {summe:.1f} s), '
+                  f'{n_fehler} Fehler')
+    return '\n'.join(zeilen)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Saisonauswertungen (xlsx + PDF) fuer alle Athlet:innen.')
+    ap.add_argument('saison', type=int)
+    ap.add_argument('--quelle', default='data/master.csv')
+    ap.add_argument('--ziel', default='berichte', help='Ausgabeordner (wird angelegt)')
+    ap.add_argument('--worker', type=int, default=None,
+                    help='Anzahl Prozesse (Standard: alle CPU-Kerne)')
+    ap.add_argument('--athlet', action='append', help='nur diese Athlet:innen (mehrfach moeglich)')
+    ap.add_argument('--format', dest='formate', action='append', choices=FORMATE,
+                    help='nur dieses Format (mehrfach moeglich, Standard: beide)')
+    ap.add_argument('--messung', action='store_true',
+                    help='je Export die Zeitaufschluesselung nach Stufen ausgeben')
+    args = ap.parse_args(argv)
+
+    start = time.perf_counter()
+    master = load_master(args.quelle)
+    ergebnisse = erzeuge(master, args.saison, args.ziel, athleten=args.athlet,
+                         formate=tuple(args.formate or FORMATE), worker=args.worker,
+                         messen=args.messung)
+    if not ergebnisse:
+        print(f'Keine Rennen in {args.saison}.')
+        return 1
+    for e in ergebnisse:
+        if e[5]:
+            print(e[5], end='\n\n')
+    print(zusammenfassung(ergebnisse, time.perf_counter() - start))
+    return 1 if any(e[4] for e in ergebnisse) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Die Verlaufsdiagramme als reportlab-Vektorgrafik fuer den PDF-Export.
+
+Zeichnet die Diagrammdaten aus diagramme.py (daten_rueckstand,
+daten_ermuedung) direkt als reportlab-Drawing statt als 150-dpi-PNG: die
+Linien bleiben beim Zoomen scharf, das PDF wird deutlich kleiner, und
+matplotlib muss fuer ein PDF gar nicht erst geladen werden.
+
+Das Aussehen folgt dem matplotlib-Bild der App - dieselben LINIENFARBEN,
+Punkte auf den Messwerten, Luecken bei fehlenden Werten, Gitter nur
+waagrecht, Legende rechts neben der Zeichenflaeche. Gezeichnet wird in einer
+festen Entwurfsgroesse und als Ganzes auf die Zielbreite skaliert, damit
+Schrift und Linien im selben Verhaeltnis stehen wie im PNG.
+"""
+
+import math
+
+import numpy as np
+from reportlab.graphics.shapes import Drawing, Group, Line, PolyLine, Circle, String
+from reportlab.lib import colors
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from diagramme import LINIENFARBEN
+from messung import gemessen
+
+# Entwurfsgroesse in Punkt, Seitenverhaeltnis wie grafikseite (0.40)
+BREITE, HOEHE = 720.0, 288.0
+
+SCHRIFT, SCHRIFT_FETT = 'Helvetica', 'Helvetica-Bold'
+TITELFARBE = colors.HexColor('#1F3348')
+ACHSE = colors.HexColor('#B8C4D0')
+BESCHRIFTUNG = colors.HexColor('#3D4B59')
+GITTER = colors.HexColor('#D8DEE4')
+NULLLINIE = colors.Color(0xB3 / 255, 0x26 / 255, 0x1E / 255, alpha=0.55)
+
+TICK = 3.5          # Laenge der Achsenstriche
+ZEILE = 12.5        # Zeilenabstand der Legende
+RAND = 0.05         # Luft um die Daten, wie matplotlibs axes.margins
+
+
+def _schritt(spanne, ziel=6):
+    """Runder Tick-Abstand (1, 2, 2.5, 5 mal Zehnerpotenz) fuer etwa ziel Ticks."""
+    roh = spanne / ziel
+    basis = 10 ** math.floor(math.log10(roh))
+    for f in (1, 2, 2.5, 5, 10):
+        if f * basis >= roh:
+            return f * basis
+    return 10 * basis
+
+
+def _nachkomma(schritt):
+    for stellen in range(4):
+        if abs(round(schritt * 10 ** stellen) - schritt * 10 ** stellen) < 1e-6:
+            return stellen
+    return 3
+
+
+def _y_achse(linien, nulllinie):
+    """(unten, oben, ticks, nachkommastellen) der y-Achse."""
+    werte = np.concatenate([np.asarray(w, float) for _, w in linien]) if linien else np.empty(0)
+    werte = werte[~np.isnan(werte)]
+    if nulllinie:
+        werte = np.append(werte, 0.0)
+    lo, hi = (float(werte.min()), float(werte.max())) if werte.size else (0.0, 1.0)
+    if hi - lo < 1e-9:
+        lo, hi = lo - 0.5, hi + 0.5
+    luft = RAND * (hi - lo)
+    lo, hi = lo - luft, hi + luft
+    schritt = _schritt(hi - lo)
+    ticks = [k * schritt for k in range(math.ceil(lo / schritt - 1e-9),
+                                        math.floor(hi / schritt + 1e-9) + 1)]
+    return lo, hi, ticks, _nachkomma(schritt)
+
+
+def _text(x, y, text, groesse, anker='start', fett=False, farbe=BESCHRIFTUNG):
+    return String(x, y, text, fontName=SCHRIFT_FETT if fett else SCHRIFT, fontSize=groesse,
+                  fillColor=farbe, textAnchor=anker)
+
+
+@gemessen('grafik.vektor')
+def vektordiagramm(daten, breite):
+    """Drawing (ein Flowable) in der Breite breite fuer daten aus diagramme.py."""
+    linien, xt = daten['linien'], daten['xt']
+    g = Group()
+
+    # Legende rechts, je Spalte so breit wie der laengste Eintrag; was nicht
+    # untereinander in die Hoehe passt, kommt in weitere Spalten
+    unten, oben = 22.0, HOEHE - 32.0
+    pro_spalte = int((oben - 10) / ZEILE) + 1
+    spaltenbreite = (max(stringWidth(name, SCHRIFT, 8) for name, _ in linien) + 30) if linien else 0
+    legende = spaltenbreite * math.ceil(len(linien) / pro_spalte)
+    lo, hi, ticks, stellen = _y_achse(linien, daten['nulllinie'])
+    ticktexte = [f'{0.0 if abs(t) < 1e-9 else t:.{stellen}f}' for t in ticks]
+    links = 16 + max(stringWidth(t, SCHRIFT, 8.5) for t in ticktexte) + TICK + 4
+    rechts = BREITE - legende - 6
+
+    n = len(xt)
+    x_lo, x_hi = 1 - RAND * max(n - 1, 1), n + RAND * max(n - 1, 1)
+
+    def px(x):
+        return links + (x - x_lo) / (x_hi - x_lo) * (rechts - links)
+
+    def py(y):
+        return unten + (y - lo) / (hi - lo) * (oben - unten)
+
+    # Gitter und y-Beschriftung
+    for t, text in zip(ticks, ticktexte):
+        y = py(t)
+        g.add(Line(links, y, rechts, y, strokeColor=GITTER, strokeWidth=0.9))
+        g.add(Line(links - TICK, y, links, y, strokeColor=BESCHRIFTUNG, strokeWidth=0.8))
+        g.add(_text(links - TICK - 3, y - 3, text, 8.5, anker='end'))
+    ylabel = _text(0, 0, daten['ylabel'], 8.5, anker='middle', farbe=colors.black)
+    g.add(Group(ylabel, transform=(0, 1, -1, 0, 10, (unten + oben) / 2)))
+
+    # x-Beschriftung
+    for i, text in enumerate(xt, 1):
+        x = px(i)
+        g.add(Line(x, unten, x, unten - TICK, strokeColor=BESCHRIFTUNG, strokeWidth=0.8))
+        g.add(_text(x, unten - TICK - 9, text, 8.5, anker='middle'))
+
+    g.add(Line(links, unten, links, oben, strokeColor=ACHSE, strokeWidth=0.8))
+    g.add(Line(links, unten, rechts, unten, strokeColor=ACHSE, strokeWidth=0.8))
+
+    # Linien: Luecken bei fehlenden Werten, Punkte auf jedem Messwert
+    for k, (_, werte) in enumerate(linien):
+        farbe = colors.HexColor(LINIENFARBEN[k % len(LINIENFARBEN)])
+        punkte = [(px(i), py(v)) if not np.isnan(v) else None for i, v in enumerate(werte, 1)]
+        zug = []
+        for p in punkte + [None]:
+            if p is not None:
+                zug.append(p)
+                continue
+            if len(zug) > 1:
+                g.add(PolyLine([c for q in zug for c in q], strokeColor=farbe, strokeWidth=2.0,
+                               strokeLineJoin=1, strokeLineCap=1))
+            zug = []
+        for p in punkte:
+            if p is not None:
+                g.add(Circle(p[0], p[1], 1.9, fillColor=farbe, strokeColor=None))
+
+    if daten['nulllinie']:
+        g.add(Line(links, py(0), rechts, py(0), strokeColor=NULLLINIE, strokeWidth=1.2))
+
+    # Titel ueber der Zeichenflaeche zentriert, aber nie ueber den Rand hinaus;
+    # ein sehr langer (langer Ortsname der Referenz) wird kleiner gesetzt
+    groesse = min(11.0, 11.0 * (BREITE - 8) / stringWidth(daten['titel'], SCHRIFT_FETT, 11))
+    titelbreite = stringWidth(daten['titel'], SCHRIFT_FETT, groesse)
+    mitte = min(max((links + rechts) / 2, titelbreite / 2), BREITE - titelbreite / 2)
+    g.add(_text(mitte, HOEHE - 16, daten['titel'], groesse, anker='middle', fett=True,
+                farbe=TITELFARBE))
+
+    for k, (name, _) in enumerate(linien):
+        farbe = colors.HexColor(LINIENFARBEN[k % len(LINIENFARBEN)])
+        spalte, zeile = divmod(k, pro_spalte)
+        y = oben - 6 - ZEILE * zeile
+        x = rechts + 8 + spaltenbreite * spalte
+        g.add(Line(x, y, x + 20, y, strokeColor=farbe, strokeWidth=2.0))
+        g.add(Circle(x + 10, y, 1.9, fillColor=farbe, strokeColor=None))
+        g.add(_text(x + 26, y - 2.8, name, 8, farbe=colors.black))
+
+    massstab = breite / BREITE
+    g.transform = (massstab, 0, 0, massstab, 0, 0)
+    zeichnung = Drawing(breite, HOEHE * massstab)
+    zeichnung.add(g)
+    return zeichnung
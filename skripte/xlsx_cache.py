@@ -2,6 +2,8 @@ import re, zipfile, io, copy
 import xml.etree.ElementTree as ET
 from xml.sax.saxutils import escape
 
+from messung import gemessen, spanne
+
 NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
 ET.register_namespace('', NS)
 
@@ -12,12 +14,15 @@ def _q(tag):
 def sheet_dateien(daten_bytes):
     """Ordnet Blattnamen ihrer XML-Datei im Zip zu - unabhaengig von
     Attributreihenfolge, da openpyxl-Versionen hier variieren."""
-    def attribute(tag_text):
-        return dict(re.findall(r'(\w[\w:]*)="([^"]*)"', tag_text))
-
     with zipfile.ZipFile(io.BytesIO(daten_bytes)) as z:
         wbxml = z.read('xl/workbook.xml').decode('utf-8')
         rels = z.read('xl/_rels/workbook.xml.rels').decode('utf-8')
+    return _sheet_dateien(wbxml, rels)
+
+
+def _sheet_dateien(wbxml, rels):
+    def attribute(tag_text):
+        return dict(re.findall(r'(\w[\w:]*)="([^"]*)"', tag_text))
 
     name_zu_rid = {}
     for tag in re.findall(r'<sheet\b[^>]*/>', wbxml):
@@ -34,6 +39,100 @@ def sheet_dateien(daten_bytes):
 
     return {name: rid_zu_ziel[rid] for name, rid in name_zu_rid.items() if rid in rid_zu_ziel}
 
+class XlsxPaket:
+    """Ein xlsx-Zip, einmal geoeffnet, fuer mehrere Patch-Durchgaenge.
+
+    styles.xml wird hoechstens einmal geparst und einmal serialisiert, Blatt-
+    XML hoechstens einmal dekodiert - egal wie viele Durchgaenge daran
+    arbeiten. Beim Zurueckschreiben wird jeder Eintrag ueber die normale
+    zipfile-API neu geschrieben (ein Athletenblatt: wenige Millisekunden).
+
+    Als Kontextmanager benutzen (oder close() aufrufen), damit das
+    Quell-Zip auch geschlossen wird, wenn ein Durchgang scheitert.
+    """
+
+    STYLES = 'xl/styles.xml'
+
+    def __init__(self, daten_bytes):
+        self._zip = zipfile.ZipFile(io.BytesIO(daten_bytes))
+        self._geaendert = {}      # Dateiname -> neue Bytes
+        self._xml = {}            # Dateiname -> dekodierter (ggf. gepatchter) Text
+        self._styles = None
+        self._blaetter = None
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def lies(self, name):
+        if name in self._geaendert:
+            return self._geaendert[name]
+        return self._zip.read(name)
+
+    def blatt_datei(self, blattname):
+        if self._blaetter is None:
+            self._blaetter = _sheet_dateien(self.lies('xl/workbook.xml').decode('utf-8'),
+                                            self.lies('xl/_rels/workbook.xml.rels').decode('utf-8'))
+        return 'xl/worksheets/' + self._blaetter[blattname]
+
+    def blatt_xml(self, blattname):
+        datei = self.blatt_datei(blattname)
+        if datei not in self._xml:
+            self._xml[datei] = self.lies(datei).decode('utf-8')
+        return self._xml[datei]
+
+    def setze_blatt_xml(self, blattname, xml):
+        self._xml[self.blatt_datei(blattname)] = xml
+
+    def styles(self):
+        """Wurzel von styles.xml als ElementTree - Aenderungen daran werden
+        beim Zurueckschreiben uebernommen."""
+        if self._styles is None:
+            self._styles = ET.fromstring(self.lies(self.STYLES).decode('utf-8'))
+        return self._styles
+
+    def als_bytes(self):
+        geaendert = dict(self._geaendert)
+        for datei, xml in self._xml.items():
+            geaendert[datei] = xml.encode('utf-8')
+        if self._styles is not None:
+            geaendert[self.STYLES] = ET.tostring(self._styles, encoding='unicode').encode('utf-8')
+
+        out = io.BytesIO()
+        with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as z:
+            for info in self._zip.infolist():
+                zi = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                zi.compress_type = zipfile.ZIP_DEFLATED
+                zi.external_attr = info.external_attr
+                inhalt = geaendert.get(info.filename)
+                z.writestr(zi, inhalt if inhalt is not None else self._zip.read(info))
+        return out.getvalue()
+
+
+@gemessen('zip.nachbearbeitung')
+def nachbearbeite(daten_bytes, durchgaenge):
+    """Wendet alle Patch-Durchgaenge auf ein einmal geoeffnetes xlsx an.
+
+    durchgaenge: Funktionen f(paket), ausgefuehrt in Listenreihenfolge auf
+    demselben XlsxPaket - z.B. [rahmen_und_fuellung(...), apply_flags].
+    Das Zip wird genau einmal gelesen und einmal geschrieben.
+    """
+    with spanne('zip.lesen'):
+        paket = XlsxPaket(daten_bytes)
+    with paket:
+        with spanne('zip.durchgaenge'):
+            for durchgang in durchgaenge:
+                durchgang(paket)
+        with spanne('zip.schreiben'):
+            return paket.als_bytes()
+
+
 def injiziere_cache_werte(daten_bytes, werte):
     """werte: {blattname: {zellref: (wert, ist_text)}} -> gepatchte Bytes.
 
@@ -42,38 +141,66 @@ def injiziere_cache_werte(daten_bytes, werte):
     LibreOffice rechnen beim Oeffnen ohnehin neu, aber Numbers vertraut
     dem leeren Cache und zeigt sonst 0 statt des echten Werts.
     """
-    dateien = sheet_dateien(daten_bytes)
-    with zipfile.ZipFile(io.BytesIO(daten_bytes)) as z:
-        inhalt = {n: z.read(n) for n in z.namelist()}
-        infos = {n: z.getinfo(n) for n in z.namelist()}
+    return nachbearbeite(daten_bytes, [cache_werte(werte)])
+
+
+def cache_werte(werte):
+    """Durchgang fuer nachbearbeite(), siehe injiziere_cache_werte()."""
+    return lambda paket: _cache_werte(paket, werte)
+
+
+# Eine Zelle im Blatt-XML: <c r="B7" ...>inhalt</c> oder <c r="B7" .../>.
+# Gruppen: Zellbezug, restliche Attribute, Inhalt (None bei selbstschliessend).
+_ZELLE = re.compile(r'<c r="([A-Z]+[0-9]+)"([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+# Formelzelle: Formel, danach optional ein (auch leerer) zwischengespeicherter Wert
+_FORMEL = re.compile(r'(<f>.*?</f>)(?:<v>.*?</v>|<v\s*/>)?$', re.S)
+_STIL = re.compile(r'\bs="(\d+)"')
+
+
+def _zellindex(xml):
+    """Zellbezug -> Match der ganzen Zelle, in einem einzigen Lauf ueber das Blatt.
+
+    Ersetzt die frueheren Einzelsuchen (ein re.search bzw. re.compile je
+    Zelle ueber das ganze Blatt-XML), die bei vielen Zellen quadratisch wurden.
+    """
+    return {m.group(1): m for m in _ZELLE.finditer(xml)}
 
+
+def _zelle(ref, attribute, inhalt):
+    return f'<c r="{ref}"{attribute}/>' if inhalt is None else f'<c r="{ref}"{attribute}>{inhalt}</c>'
+
+
+def _spleisse(xml, ersatz):
+    """Setzt alle Ersetzungen {start: (ende, text)} in einem Durchgang ein."""
+    teile, pos = [], 0
+    for start in sorted(ersatz):
+        ende, text = ersatz[start]
+        teile.append(xml[pos:start])
+        teile.append(text)
+        pos = ende
+    teile.append(xml[pos:])
+    return ''.join(teile)
+
+
+def _cache_werte(paket, werte):
     for blatt, zellwerte in werte.items():
-        datei = 'xl/worksheets/' + dateien[blatt]
-        xml = inhalt[datei].decode('utf-8')
+        xml = paket.blatt_xml(blatt)
+        index = _zellindex(xml)
+        ersatz = {}
         for ref, (wert, ist_text) in zellwerte.items():
             if wert is None:
                 continue   # nichts zu injizieren, Formel bleibt wie von openpyxl geschrieben
-            muster = re.compile(
-                r'(<c r="' + re.escape(ref) + r'"[^>]*>)(<f>.*?</f>)(?:<v>.*?</v>)?(</c>)')
-            def ersetze(m, wert=wert, ist_text=ist_text):
-                kopf = m.group(1)
-                if ist_text and 't="str"' not in kopf:
-                    kopf = kopf[:-1] + ' t="str">'
-                v = f'<v>{escape(str(wert))}</v>'
-                return kopf + m.group(2) + v + m.group(3)
-            xml, n = muster.subn(ersetze, xml, count=1)
-            if n == 0:
+            m = index.get(ref)
+            f = _FORMEL.match(m.group(3)) if m and m.group(3) is not None else None
+            if f is None:
                 print(f'WARNUNG: Zelle {blatt}!{ref} nicht gefunden')
-        inhalt[datei] = xml.encode('utf-8')
-
-    out = io.BytesIO()
-    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as z:
-        for name, data in inhalt.items():
-            zi = zipfile.ZipInfo(name, date_time=infos[name].date_time)
-            zi.compress_type = zipfile.ZIP_DEFLATED
-            zi.external_attr = infos[name].external_attr
-            z.writestr(zi, data)
-    return out.getvalue()
+                continue
+            attribute = m.group(2)
+            if ist_text and 't="str"' not in attribute:
+                attribute += ' t="str"'
+            ersatz[m.start()] = (m.end(), _zelle(ref, attribute,
+                                                 f.group(1) + f'<v>{escape(str(wert))}</v>'))
+        paket.setze_blatt_xml(blatt, _spleisse(xml, ersatz))
 
 
 def setze_rahmen_und_fuellung(daten_bytes, blattname, zellen):
@@ -88,15 +215,18 @@ def setze_rahmen_und_fuellung(daten_bytes, blattname, zellen):
     Zellen direkt auf einen neuen, garantiert korrekten Styleeintrag zeigen
     laesst (dedupliziert gegen bereits vorhandene border/fill/xf-Eintraege).
     """
-    dateien = sheet_dateien(daten_bytes)
-    with zipfile.ZipFile(io.BytesIO(daten_bytes)) as z:
-        inhalt = {n: z.read(n) for n in z.namelist()}
-        infos = {n: z.getinfo(n) for n in z.namelist()}
+    return nachbearbeite(daten_bytes, [rahmen_und_fuellung(blattname, zellen)])
+
+
+def rahmen_und_fuellung(blattname, zellen):
+    """Durchgang fuer nachbearbeite(), siehe setze_rahmen_und_fuellung()."""
+    return lambda paket: _rahmen_und_fuellung(paket, blattname, zellen)
 
-    sheet_datei = 'xl/worksheets/' + dateien[blattname]
-    sheet_xml = inhalt[sheet_datei].decode('utf-8')
 
-    stree = ET.fromstring(inhalt['xl/styles.xml'].decode('utf-8'))
+def _rahmen_und_fuellung(paket, blattname, zellen):
+    sheet_xml = paket.blatt_xml(blattname)
+
+    stree = paket.styles()
     borders_el = stree.find(_q('borders'))
     fills_el = stree.find(_q('fills'))
     cellxfs_el = stree.find(_q('cellXfs'))
@@ -104,8 +234,26 @@ def setze_rahmen_und_fuellung(daten_bytes, blattname, zellen):
     fills_list = list(fills_el)
     xfs_list = list(cellxfs_el)
 
-    def gleich(a, b):
-        return ET.tostring(a, encoding='unicode') == ET.tostring(b, encoding='unicode')
+    # Deduplizierung ueber die Serialisierung als Schluessel: einmal je
+    # vorhandenem Eintrag serialisiert, danach Nachschlagen statt Vergleich
+    # gegen jeden bisherigen Eintrag.
+    def schluessel(el):
+        return ET.tostring(el, encoding='unicode')
+
+    def verzeichnis(liste):
+        v = {}
+        for i, el in enumerate(liste):
+            v.setdefault(schluessel(el), i)
+        return v
+
+    def index_von(neu, liste, v):
+        k = schluessel(neu)
+        if k not in v:
+            liste.append(neu)
+            v[k] = len(liste) - 1
+        return v[k]
+
+    borders_v, fills_v, xfs_v = verzeichnis(borders_list), verzeichnis(fills_list), verzeichnis(xfs_list)
 
     def side_el(tag, seite):
         e = ET.Element(_q(tag))
@@ -119,26 +267,21 @@ def setze_rahmen_und_fuellung(daten_bytes, blattname, zellen):
         neu = ET.Element(_q('border'))
         for tag, seite in (('left', left), ('right', right), ('top', top), ('bottom', bottom)):
             neu.append(side_el(tag, seite))
-        for i, b in enumerate(borders_list):
-            if gleich(b, neu):
-                return i
-        borders_list.append(neu)
-        return len(borders_list) - 1
+        return index_von(neu, borders_list, borders_v)
 
     def fill_index(farbe):
         neu = ET.Element(_q('fill'))
         pf = ET.SubElement(neu, _q('patternFill'))
         pf.set('patternType', 'solid')
         ET.SubElement(pf, _q('fgColor')).set('rgb', farbe)
-        for i, f in enumerate(fills_list):
-            if gleich(f, neu):
-                return i
-        fills_list.append(neu)
-        return len(fills_list) - 1
+        return index_von(neu, fills_list, fills_v)
+
+    zellindex = _zellindex(sheet_xml)
 
     def aktueller_style_index(ref):
-        m = re.search(r'<c r="' + re.escape(ref) + r'"[^>]*?\bs="(\d+)"', sheet_xml)
-        return int(m.group(1)) if m else 0
+        m = zellindex.get(ref)
+        s = _STIL.search(m.group(2)) if m else None
+        return int(s.group(1)) if s else 0
 
     ersatz = {}
     for ref, spec in zellen.items():
@@ -151,15 +294,7 @@ def setze_rahmen_und_fuellung(daten_bytes, blattname, zellen):
         if spec.get('fill'):
             neu_xf.set('fillId', str(fill_index(spec['fill'])))
             neu_xf.set('applyFill', '1')
-        gefunden = None
-        for i, xf in enumerate(xfs_list):
-            if gleich(xf, neu_xf):
-                gefunden = i
-                break
-        if gefunden is None:
-            xfs_list.append(neu_xf)
-            gefunden = len(xfs_list) - 1
-        ersatz[ref] = gefunden
+        ersatz[ref] = index_von(neu_xf, xfs_list, xfs_v)
 
     for el in list(borders_el):
         borders_el.remove(el)
@@ -179,29 +314,18 @@ def setze_rahmen_und_fuellung(daten_bytes, blattname, zellen):
         cellxfs_el.append(x)
     cellxfs_el.set('count', str(len(xfs_list)))
 
-    inhalt['xl/styles.xml'] = ET.tostring(stree, encoding='unicode').encode('utf-8')
-
+    splice = {}
     for ref, neu_idx in ersatz.items():
-        muster = re.compile(r'(<c r="' + re.escape(ref) + r'"[^>]*?)\bs="\d+"')
-        neu_xml, n = muster.subn(lambda m: m.group(1) + f's="{neu_idx}"', sheet_xml, count=1)
+        m = zellindex.get(ref)
+        if m is None:
+            print(f'WARNUNG: Zelle {blattname}!{ref} nicht gefunden (Rahmen/Fuellung)')
+            continue
+        attribute, n = _STIL.subn(f's="{neu_idx}"', m.group(2), count=1)
         if n == 0:
             # Zelle hatte noch gar keinen Stylevermerk (Standardstil 0)
-            muster2 = re.compile(r'(<c r="' + re.escape(ref) + r'")')
-            neu_xml, n = muster2.subn(lambda m: m.group(1) + f' s="{neu_idx}"', sheet_xml, count=1)
-        if n == 0:
-            print(f'WARNUNG: Zelle {blattname}!{ref} nicht gefunden (Rahmen/Fuellung)')
-        else:
-            sheet_xml = neu_xml
-    inhalt[sheet_datei] = sheet_xml.encode('utf-8')
-
-    out = io.BytesIO()
-    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as z:
-        for name, data in inhalt.items():
-            zi = zipfile.ZipInfo(name, date_time=infos[name].date_time)
-            zi.compress_type = zipfile.ZIP_DEFLATED
-            zi.external_attr = infos[name].external_attr
-            z.writestr(zi, data)
-    return out.getvalue()
+            attribute = f' s="{neu_idx}"' + attribute
+        splice[m.start()] = (m.end(), _zelle(ref, attribute, m.group(3)))
+    paket.setze_blatt_xml(blattname, _spleisse(sheet_xml, splice))
 
 
 def stelle_apply_flags_sicher(daten_bytes):
@@ -224,11 +348,12 @@ def stelle_apply_flags_sicher(daten_bytes):
     ungefaerbt. Beide Fixes sind rein additiv, an den Werten selbst aendert
     sich nichts.
     """
-    with zipfile.ZipFile(io.BytesIO(daten_bytes)) as z:
-        inhalt = {n: z.read(n) for n in z.namelist()}
-        infos = {n: z.getinfo(n) for n in z.namelist()}
+    return nachbearbeite(daten_bytes, [apply_flags])
 
-    stree = ET.fromstring(inhalt['xl/styles.xml'].decode('utf-8'))
+
+def apply_flags(paket):
+    """Durchgang fuer nachbearbeite(), siehe stelle_apply_flags_sicher()."""
+    stree = paket.styles()
     cellxfs_el = stree.find(_q('cellXfs'))
     for xf in cellxfs_el:
         for id_attr, apply_attr in (('fontId', 'applyFont'), ('fillId', 'applyFill'),
@@ -260,14 +385,3 @@ def stelle_apply_flags_sicher(daten_bytes):
                 farbe = '00' + farbe
                 fg.set('rgb', farbe)
             ET.SubElement(pf, _q('bgColor')).set('rgb', farbe or fg.get('rgb'))
-
-    inhalt['xl/styles.xml'] = ET.tostring(stree, encoding='unicode').encode('utf-8')
-
-    out = io.BytesIO()
-    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as z:
-        for name, data in inhalt.items():
-            zi = zipfile.ZipInfo(name, date_time=infos[name].date_time)
-            zi.compress_type = zipfile.ZIP_DEFLATED
-            zi.external_attr = infos[name].external_attr
-            z.writestr(zi, data)
-    return out.getvalue()
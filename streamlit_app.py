@@ -2,13 +2,15 @@
 
 Liest data/master.csv (einzige Datenquelle, wird vom Markier-Tool per
 GitHub-Commit aktualisiert). Bietet drei Ansichten:
-  Athlet      - Saisonuebersicht mit Excel- und PDF-Download
+  Athlet      - Saisonuebersicht mit Excel- und PDF-Download (auf Knopfdruck)
   Vergleich   - beliebige Rennen gegeneinander
+  Kader       - Perzentile je Abschnitt ueber alle Athlet:innen einer Saison
   Alle Daten  - gefilterte Rohtabelle mit CSV-Export
 
 Lauf lokal: streamlit run streamlit_app.py
 """
 
+import contextlib
 import sys
 from pathlib import Path
 
@@ -18,40 +20,121 @@ import streamlit as st
 sys.path.insert(0, str(Path(__file__).parent / 'skripte'))
 
 from master_io import load_master                                  # noqa: E402
-from auswertung import select_season, label                        # noqa: E402
-from export_utils import xlsx_bytes, pdf_bytes, pdf_bytes_auswahl        # noqa: E402
-from pdf_export import grafik_rueckstand, grafik_ermuedung          # noqa: E402
+from masterwaechter import MasterWaechter                           # noqa: E402
+from auswertung import (MasterIndex, select_season,                 # noqa: E402
+                        schnellstes_vollstaendiges)
+from exportauftraege import (Auftragsverwaltung, Artefaktablage,   # noqa: E402
+                              WARTET, LAEUFT, FEHLER)
+from diagramme import grafik_rueckstand, grafik_ermuedung           # noqa: E402
 from html_tabelle import rennen_tabelle_html                        # noqa: E402
+from kader import Kaderauswertung, GRUPPEN, UNTERTEILUNG, SCHRITTE  # noqa: E402
+from rennsuche import Rennsuche                                     # noqa: E402
+from messung import sammeln                                         # noqa: E402
 
 DATA_FILE = Path(__file__).parent / 'data' / 'master.csv'
+EXPORT_DIR = Path(__file__).parent / 'data' / 'exporte'
 
 st.set_page_config(page_title='400 m Hürden — Auswertung', layout='wide')
 
 
 # ---------------------------------------------------------------- Daten
-@st.cache_data(ttl=60)
-def get_master():
+@st.cache_resource
+def get_waechter():
+    """Ein Waechter je App-Prozess: bemerkt Aenderungen am CSV binnen etwa
+    zwei Sekunden, statt alle 60 s blind neu einzulesen."""
+    return MasterWaechter(DATA_FILE)
+
+
+def get_version():
+    """Versionsmarke des Masters (Inhalts-Hash, gesamt und je Athlet:in)."""
+    return get_waechter().version
+
+
+@st.cache_data(max_entries=2)
+def get_master(gesamt):
+    """Der Master zum Inhalts-Hash gesamt: neu geladen wird nur, wenn sich der
+    Inhalt tatsaechlich geaendert hat."""
     return load_master(str(DATA_FILE))
 
 
-@st.cache_data(ttl=60, show_spinner='Excel wird erstellt …')
-def get_xlsx(athlet, saison, _stand):
-    return xlsx_bytes(get_master(), athlet, saison)
+@st.cache_resource(max_entries=2)
+def get_index(gesamt):
+    """MasterIndex je Datenstand - einmal gebaut, von allen Sitzungen geteilt
+    (nur gelesen, darum cache_resource statt einer Kopie je Aufruf)."""
+    return MasterIndex(get_master(gesamt))
+
+
+@st.cache_resource(max_entries=2)
+def get_kader(gesamt):
+    """Kaderauswertung je Datenstand, wie get_index von allen Sitzungen geteilt;
+    sie rechnet jede Saison/Unterteilung nur beim ersten Aufruf."""
+    return Kaderauswertung(get_master(gesamt))
+
 
+@st.cache_resource(max_entries=2)
+def get_suche(gesamt):
+    """Rennsuche (aehnliche Zwischenzeitprofile) je Datenstand, geteilt."""
+    return Rennsuche(get_master(gesamt))
 
-@st.cache_data(ttl=60, show_spinner='PDF wird erstellt …')
-def get_pdf(athlet, saison, _stand):
-    return pdf_bytes(get_master(), athlet, saison)
 
+@st.cache_resource(max_entries=2)
+def get_rennauswahl(gesamt):
+    """Beschriftung -> race_id aller Rennen mit Datum, fuer die Auswahllisten
+    im Vergleich-Reiter; je Datenstand einmal aus get_index().beschriftungen."""
+    index = get_index(gesamt)
+    mit_datum = index.master['datum'].notna()
+    return dict(zip(index.beschriftungen['auswahl'][mit_datum], index.master['race_id'][mit_datum]))
 
-@st.cache_data(ttl=60, show_spinner='PDF wird erstellt …')
-def get_pdf_auswahl(race_ids, titel, _stand):
-    return pdf_bytes_auswahl(get_master(), list(race_ids), titel)
 
+# ---------------------------------------------------------------- Exporte
+# Exporte entstehen erst auf Knopfdruck und im Hintergrund: ein Athleten- oder
+# Saisonwechsel zeichnet nur Tabellen und Grafiken, nie ein Excel oder PDF.
+# Fertige Dateien liegen dauerhaft in data/exporte/ und gelten fuer alle
+# Sitzungen, bis sich ein Rennen der Athlet:in aendert (siehe exportauftraege).
 
-def datenstand(master):
-    """Aendert sich der Rueckgabewert, verfaellt der Export-Cache automatisch."""
-    return (len(master), str(master['erfasst_am'].max()))
+@st.cache_resource
+def get_auftraege():
+    """Auftragstabelle und Ablage, von allen Sitzungen geteilt."""
+    return Auftragsverwaltung(Artefaktablage(EXPORT_DIR))
+
+
+def export_knopf(art, auftragsdaten, text, dateiname, mime):
+    """Erstellen-Knopf -> Fortschritt -> Download-Knopf fuer einen Export.
+
+    auftragsdaten: (schluessel, erzeuge, beschreibung) aus Auftragsverwaltung.xlsx/
+    .pdf/.auswahl. Liegt die Datei schon in der Ablage (andere Sitzung, frueherer
+    Lauf), gibt es sofort den Download-Knopf."""
+    verwaltung = get_auftraege()
+    schluessel, erzeuge, beschreibung = auftragsdaten
+    auftrag = verwaltung.auftrag(schluessel)
+    if auftrag is not None and auftrag.zustand in (WARTET, LAEUFT):
+        _fortschritt(art, schluessel, text)
+        return
+    daten = verwaltung.ergebnis(art, schluessel)
+    if daten is not None:
+        st.download_button(f'⬇ {text} herunterladen', daten, file_name=dateiname,
+                           mime=mime, key=f'laden-{art}', width='stretch')
+        return
+    if auftrag is not None and auftrag.zustand == FEHLER:
+        st.error(f'{text} konnte nicht erstellt werden: {auftrag.fehler}')
+    if st.button(f'{text} erstellen', key=f'erstellen-{art}', width='stretch'):
+        verwaltung.einreichen(art, schluessel, erzeuge, beschreibung,
+                              messen=st.session_state.get('messung', False))
+        st.rerun()
+
+
+@st.fragment(run_every=0.5)
+def _fortschritt(art, schluessel, text):
+    """Fortschritt aus der letzten Dauer dieser Exportart geschaetzt; ist der
+    Auftrag fertig, zeichnet ein voller Rerun den Download-Knopf."""
+    verwaltung = get_auftraege()
+    auftrag = verwaltung.auftrag(schluessel)
+    if auftrag is None or auftrag.zustand not in (WARTET, LAEUFT):
+        st.rerun()
+    vergangen = auftrag.vergangen()
+    erwartet = verwaltung.erwartete_dauer(art)
+    anteil = min(vergangen / erwartet, 0.95) if erwartet else 0.0
+    st.progress(anteil, text=f'{text} wird erstellt … {vergangen:.0f} s')
 
 
 # ---------------------------------------------------------------- Anzeige
@@ -73,20 +156,20 @@ def rennen_tabelle(rennen, pb_id, vgl=False):
         st.markdown(html, unsafe_allow_html=True)
 
 
-def tab_athlet(master):
+def tab_athlet(master, version):
     athleten = sorted(master['athlet'].dropna().unique())
     c1, c2 = st.columns([2, 1])
     athlet = c1.selectbox('Athlet:in', athleten)
 
-    jahre = sorted(master.loc[master['athlet'] == athlet, '_jahr'].dropna().unique().astype(int),
-                   reverse=True)
+    index = get_index(version.gesamt)
+    jahre = index.jahre(athlet)
     if not jahre:
         st.info(f'Keine Rennen für {athlet}.')
         return
     saison = c2.selectbox('Saison', jahre)
 
     try:
-        auswahl = select_season(master, athlet, saison)
+        auswahl = select_season(master, athlet, saison, index=index)
     except ValueError as e:
         st.warning(str(e))
         return
@@ -114,36 +197,65 @@ def tab_athlet(master):
         col2.image(bild2, width='stretch')
 
     st.subheader('Export')
-    stand = datenstand(master)
     c1, c2 = st.columns(2)
-    c1.download_button(
-        '⬇ Excel herunterladen', get_xlsx(athlet, saison, stand),
-        file_name=f'{athlet}_400mH_{saison}.xlsx',
-        mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        width='stretch')
-    c2.download_button(
-        '⬇ PDF herunterladen', get_pdf(athlet, saison, stand),
-        file_name=f'{athlet}_400mH_{saison}.pdf', mime='application/pdf',
-        width='stretch')
-
-
-def tab_vergleich(master):
+    stand = version.athlet(athlet)
+    with c1:
+        export_knopf(
+            'xlsx', Auftragsverwaltung.xlsx(master, stand, athlet, saison, index=index), 'Excel',
+            f'{athlet}_400mH_{saison}.xlsx',
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    with c2:
+        export_knopf(
+            'pdf', Auftragsverwaltung.pdf(master, stand, athlet, saison, index=index), 'PDF',
+            f'{athlet}_400mH_{saison}.pdf', 'application/pdf')
+
+
+def _als_vergleich(labels):
+    st.session_state['vergleich-rennen'] = labels[:10]
+
+
+def aehnliche_rennen(suche, optionen):
+    """Ausgangsrennen waehlen, die aehnlichsten Rennen des ganzen Masters
+    anzeigen und auf Wunsch als Vergleichsauswahl uebernehmen."""
+    with st.expander('🔍 Ähnliche Rennen finden'):
+        st.caption('Ähnlich heisst: gleiches Zwischenzeitprofil (H1–H10 im Verhältnis zur '
+                   'Endzeit) und ähnliche Endzeit. Nur vollständig erfasste Rennen.')
+        beschriftung = {r: l for l, r in optionen.items()}
+        c1, c2, c3 = st.columns([3, 1, 2])
+        ausgang = c1.selectbox('Ausgangsrennen', [l for l, r in optionen.items() if suche.enthaelt(r)],
+                               index=None, placeholder='Rennen wählen', key='suche-rennen')
+        k = c2.number_input('Anzahl', min_value=1, max_value=9, value=5, key='suche-k')
+        wer = c3.radio('Athlet:in', ['alle', 'gleich', 'andere'], horizontal=True, key='suche-athlet',
+                       format_func={'alle': 'alle', 'gleich': 'dieselbe',
+                                    'andere': 'nur andere'}.get)
+        if ausgang is None:
+            return
+        treffer = suche.aehnliche(optionen[ausgang], int(k), athlet=None if wer == 'alle' else wer)
+        treffer = treffer[treffer['race_id'].isin(beschriftung.keys())]
+        labels = [beschriftung[r] for r in treffer['race_id']]
+        st.dataframe(pd.DataFrame({'Rennen': labels, 'Abstand': treffer['abstand'].to_numpy()}),
+                     hide_index=True, width='stretch',
+                     column_config={'Abstand': st.column_config.NumberColumn(
+                         format='%.2f', help='0 = identisches Profil; kleiner ist ähnlicher')})
+        st.button('Als Vergleich übernehmen', key='suche-uebernehmen',
+                  on_click=_als_vergleich, args=([ausgang] + labels,))
+
+
+def tab_vergleich(master, version):
     st.caption('Beliebige Rennen gegeneinander – auch über Athleten und Jahre hinweg. '
               'Zum Beispiel Lauf A, B und C zusammenstellen und als PDF mitnehmen.')
 
-    m = master.dropna(subset=['datum']).copy()
-    m['_label'] = m.apply(lambda r: f"{r['athlet']} — {label(r)} ({r['zeit']:.2f} s)"
-                          if pd.notna(r['zeit']) else f"{r['athlet']} — {label(r)} ({r['status']})",
-                          axis=1)
-    optionen = dict(zip(m['_label'], m['race_id']))
+    optionen = get_rennauswahl(version.gesamt)
 
-    gewaehlt = st.multiselect('Rennen wählen (2–10)', list(optionen.keys()), max_selections=10)
+    aehnliche_rennen(get_suche(version.gesamt), optionen)
+    gewaehlt = st.multiselect('Rennen wählen (2–10)', list(optionen.keys()), max_selections=10,
+                              key='vergleich-rennen')
     if len(gewaehlt) < 2:
         st.info('Mindestens zwei Rennen auswählen.')
         return
 
     ids = [optionen[g] for g in gewaehlt]
-    auswahl = m[m['race_id'].isin(ids)]
+    auswahl = master[master['race_id'].isin(ids)]
     # Reihenfolge der Auswahl beibehalten, nicht die zufaellige Tabellenreihenfolge
     auswahl = auswahl.set_index('race_id').loc[ids].reset_index()
     auswahl = auswahl.assign(_label=gewaehlt)
@@ -151,7 +263,11 @@ def tab_vergleich(master):
     zeitwerte = pd.to_numeric(auswahl['zeit'], errors='coerce')
     ref = None
     if zeitwerte.notna().any():
-        vorschlag = int(zeitwerte.idxmin())
+        # Gleicher Vorschlag wie im Auswahl-PDF: schnellstes vollstaendiges
+        # Rennen, sonst einfach das schnellste
+        schnellstes = schnellstes_vollstaendiges(auswahl)
+        vorschlag = (ids.index(schnellstes['race_id']) if schnellstes is not None
+                     else int(zeitwerte.idxmin()))
         ref_label = st.selectbox('Referenz für den Rückstand-Chart', gewaehlt, index=vorschlag)
         ref = auswahl[auswahl['_label'] == ref_label].iloc[0]
 
@@ -168,12 +284,56 @@ def tab_vergleich(master):
 
     st.subheader('Export')
     titel = st.text_input('Titel für das PDF', value='Rennvergleich')
-    stand = datenstand(master)
-    st.download_button(
-        '⬇ Auswahl als PDF herunterladen',
-        get_pdf_auswahl(tuple(ids), titel, stand),
-        file_name=f'{titel.strip().replace(" ", "_") or "Rennvergleich"}.pdf',
-        mime='application/pdf', width='stretch')
+    export_knopf(
+        'auswahl', Auftragsverwaltung.auswahl(master, version.fuer(auswahl['athlet']), ids, titel),
+        'Auswahl-PDF', f'{titel.strip().replace(" ", "_") or "Rennvergleich"}.pdf',
+        'application/pdf')
+
+
+def tab_kader(version):
+    st.caption('Der ganze Kader einer Saison: wie sich Abschnitte, Splits und Schrittzahlen '
+               'über alle Athlet:innen verteilen – und wo jede:r darin steht. Nur beendete Rennen.')
+    kader = get_kader(version.gesamt)
+
+    c1, c2, c3 = st.columns(3)
+    saison = c1.selectbox('Saison', kader.jahre(), key='kader-saison')
+    nach = c2.multiselect('Unterteilen nach', list(UNTERTEILUNG), format_func=str.capitalize,
+                          key='kader-nach')
+    gruppe = c3.radio('Werte', list(GRUPPEN), horizontal=True, key='kader-gruppe')
+
+    verteilung = kader.verteilung(saison, nach)
+    if verteilung.empty:
+        st.info(f'Keine beendeten Rennen in {saison}.')
+        return
+    format_wert = '%.1f' if gruppe == 'Schritte' else '%.2f'
+    st.dataframe(verteilung[verteilung['merkmal'].isin(GRUPPEN[gruppe])], hide_index=True,
+                 width='stretch',
+                 column_config={**{c: st.column_config.NumberColumn(format=format_wert)
+                                   for c in verteilung.columns if c.startswith('p')},
+                                'saison': st.column_config.NumberColumn(format='%d')})
+    st.caption('n = Rennen mit Wert im Merkmal · p50 = Median · p10/p90: 10 % der Rennen '
+               'liegen darunter bzw. darüber')
+
+    st.subheader('Athlet:innen im Kader')
+    merkmal = st.selectbox('Merkmal', GRUPPEN[gruppe], key='kader-merkmal')
+    st.dataframe(kader.rangliste(saison, merkmal), hide_index=True, width='stretch',
+                 column_config={
+                     'median': st.column_config.NumberColumn('Saisonmedian', format=format_wert),
+                     'bestwert': st.column_config.NumberColumn('Bestwert', format=format_wert),
+                     'lage': st.column_config.ProgressColumn(
+                         'Lage im Kader', min_value=0, max_value=100, format='%.0f %%',
+                         help='Anteil der Athlet:innen mit kleinerem Saisonmedian'
+                              + ('' if merkmal in SCHRITTE else ' (schnellerem Abschnitt)'))})
+
+    st.subheader('Export')
+    c1, c2 = st.columns(2)
+    dateiname = f'kader_{saison}' + ''.join(f'_{n}' for n in nach)
+    c1.download_button('⬇ Verteilung als CSV', verteilung.to_csv(index=False).encode('utf-8'),
+                       file_name=f'{dateiname}.csv', mime='text/csv', width='stretch')
+    with c2:
+        export_knopf(
+            'kader', Auftragsverwaltung.kader(kader, version.gesamt, saison, nach), 'Excel',
+            f'{dateiname}.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
 
 def tab_alle_daten(master):
@@ -202,6 +362,31 @@ def tab_alle_daten(master):
         file_name='400mh_export.csv', mime='text/csv')
 
 
+@st.fragment(run_every=2)
+def datenwache(gesehen):
+    """Laeuft alle zwei Sekunden, kostet dabei nur einen Vergleich. Hat der
+    Waechter eine neue Version, wird die Seite einmal neu aufgebaut."""
+    neu = get_version()
+    if neu != gesehen:
+        st.session_state['neu_seit'] = neu.geaendert_gegen(gesehen)
+        st.rerun()
+
+
+def messpanel(seite):
+    """Zeitaufschluesselung in der Seitenleiste: dieser Seitenaufbau und die
+    zuletzt gemessenen Exporte (siehe messung.py)."""
+    with st.sidebar:
+        st.caption('Seitenaufbau (ohne Treffer im Cache)')
+        st.code(seite.bericht(breite=16), language=None)
+        gemessen = [a for a in get_auftraege().tabelle() if a.messung][:5]
+        for auftrag in gemessen:
+            st.caption(f'{auftrag.beschreibung} · {auftrag.dauer:.1f} s')
+            st.code(auftrag.messung, language=None)
+        if not gemessen:
+            st.caption('Exporte werden gemessen, sobald sie bei eingeschalteter '
+                       'Zeitmessung erstellt werden.')
+
+
 # ---------------------------------------------------------------- Hauptseite
 def main():
     st.title('400 m Hürden — Saisonauswertung')
@@ -209,15 +394,29 @@ def main():
     if not DATA_FILE.exists():
         st.error(f'Datendatei nicht gefunden: {DATA_FILE}')
         return
-    master = get_master()
-
-    tab1, tab2, tab3 = st.tabs(['Athlet', 'Vergleich', 'Alle Daten'])
-    with tab1:
-        tab_athlet(master)
-    with tab2:
-        tab_vergleich(master)
-    with tab3:
-        tab_alle_daten(master)
+    version = get_version()
+    master = get_master(version.gesamt)
+    geaendert = st.session_state.pop('neu_seit', None)
+    if geaendert:
+        st.toast('Neue Daten: ' + ', '.join(geaendert[:5])
+                 + (f' und {len(geaendert) - 5} weitere' if len(geaendert) > 5 else ''))
+    datenwache(version)
+
+    messen = st.sidebar.toggle('Zeitmessung', key='messung',
+                               value=st.query_params.get('messung') == '1',
+                               help='Zeigt, wo Seitenaufbau und Exporte ihre Zeit verbringen.')
+    with sammeln('Seitenaufbau') if messen else contextlib.nullcontext() as seite:
+        tab1, tab2, tab3, tab4 = st.tabs(['Athlet', 'Vergleich', 'Kader', 'Alle Daten'])
+        with tab1:
+            tab_athlet(master, version)
+        with tab2:
+            tab_vergleich(master, version)
+        with tab3:
+            tab_kader(version)
+        with tab4:
+            tab_alle_daten(master)
+    if seite is not None:
+        messpanel(seite)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Die Skripte importieren sich gegenseitig flach (from master_io import ...)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'skripte'))
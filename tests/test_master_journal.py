@@ -0,0 +1,76 @@
+"""Journal in master_io: verfaellt, sobald das CSV anders ersetzt wird."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from master_io import (journal_pfad, lies_journal, load_master, save_master,
+                       speichere_rennen, verdichte)
+
+VORLAGE = Path(__file__).resolve().parents[1] / 'data' / 'master.csv'
+
+
+@pytest.fixture
+def master(tmp_path):
+    pfad = tmp_path / 'master.csv'
+    shutil.copy(VORLAGE, pfad)
+    return str(pfad)
+
+
+def _zeit(pfad, race_id, **kw):
+    df = load_master(pfad, **kw)
+    return float(df.loc[df['race_id'] == race_id, 'zeit'].iloc[0])
+
+
+def _erstes_rennen(pfad):
+    return load_master(pfad).iloc[0].to_dict()
+
+
+def test_journal_wird_eingespielt_und_verdichtet(master):
+    rennen = _erstes_rennen(master)
+    speichere_rennen([{**rennen, 'zeit': 99.99}], master)
+    assert _zeit(master, rennen['race_id']) == 99.99
+    assert verdichte(master) == 1
+    assert lies_journal(master) == []
+    assert _zeit(master, rennen['race_id'], speicher=False) == 99.99
+
+
+def test_csv_von_aussen_geaendert_journal_verfaellt(master):
+    rennen = _erstes_rennen(master)
+    speichere_rennen([{**rennen, 'zeit': 99.99}], master)
+
+    # wie ein Commit aus dem Markier-Tool oder ein git pull: CSV direkt ersetzt
+    df = load_master(master, speicher=False)
+    df.loc[df['race_id'] == rennen['race_id'], 'zeit'] = 50.50
+    df[df.columns[:-1]].to_csv(master, index=False, na_rep='')
+
+    assert _zeit(master, rennen['race_id']) == 50.50
+    assert verdichte(master) == 0
+    assert _zeit(master, rennen['race_id'], speicher=False) == 50.50
+
+
+def test_save_master_leert_journal(master):
+    rennen = _erstes_rennen(master)
+    speichere_rennen([{**rennen, 'zeit': 99.99}], master)
+    df = load_master(master)
+    df.loc[df['race_id'] == rennen['race_id'], 'zeit'] = 51.0
+    save_master(df, master)
+
+    assert journal_pfad(master).stat().st_size == 0
+    assert _zeit(master, rennen['race_id']) == 51.0
+    verdichte(master)
+    assert _zeit(master, rennen['race_id'], speicher=False) == 51.0
+
+
+def test_neuer_eintrag_nach_fremdem_csv_beginnt_neues_journal(master):
+    erstes, zweites = load_master(master).iloc[:2].to_dict('records')
+    speichere_rennen([{**erstes, 'zeit': 99.99}], master)
+    df = load_master(master, speicher=False)
+    df.loc[df['race_id'] == erstes['race_id'], 'zeit'] = 50.50
+    df[df.columns[:-1]].to_csv(master, index=False, na_rep='')
+
+    speichere_rennen([{**zweites, 'zeit': 77.77}], master)
+    assert len(lies_journal(master)) == 1
+    assert _zeit(master, erstes['race_id']) == 50.50
+    assert _zeit(master, zweites['race_id']) == 77.77
@@ -0,0 +1,54 @@
+"""Nachbearbeitetes Athletenblatt: gueltiges Zip, von openpyxl lesbar."""
+
+import io
+import zipfile
+from pathlib import Path
+
+import openpyxl
+
+from export_utils import xlsx_bytes
+from master_io import load_master
+from xlsx_cache import nachbearbeite
+
+VORLAGE = Path(__file__).resolve().parents[1] / 'data' / 'master.csv'
+
+
+def test_athletenblatt_roundtrip():
+    master = load_master(VORLAGE, speicher=False)
+    athlet = master['athlet'].value_counts().index[0]
+    saison = int(master.loc[master['athlet'] == athlet, '_jahr'].max())
+    daten = xlsx_bytes(master, athlet, saison)
+
+    with zipfile.ZipFile(io.BytesIO(daten)) as z:
+        assert z.testzip() is None
+    mappe = openpyxl.load_workbook(io.BytesIO(daten))
+    assert mappe.sheetnames
+
+
+def test_nachbearbeite_ohne_aenderung_behaelt_inhalt():
+    quelle = io.BytesIO()
+    with zipfile.ZipFile(quelle, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('a.xml', '<a/>' * 1000)
+        z.writestr('b/c.xml', b'\x00\x01' * 50)
+    daten = nachbearbeite(quelle.getvalue(), [])
+
+    with zipfile.ZipFile(io.BytesIO(daten)) as z:
+        assert z.testzip() is None
+        assert z.read('a.xml') == b'<a/>' * 1000
+        assert z.read('b/c.xml') == b'\x00\x01' * 50
+
+
+def test_paket_wird_bei_fehler_geschlossen():
+    quelle = io.BytesIO()
+    with zipfile.ZipFile(quelle, 'w') as z:
+        z.writestr('a.xml', '<a/>')
+
+    def kaputt(paket):
+        kaputt.paket = paket
+        raise RuntimeError('Durchgang gescheitert')
+
+    try:
+        nachbearbeite(quelle.getvalue(), [kaputt])
+    except RuntimeError:
+        pass
+    assert kaputt.paket._zip.fp is None